@@ -57,9 +57,9 @@ export const analyzeImage = async (file, qr_text = '', section = 'screenshot') =
 
 export const getResults = async (filters) => {
   try {
-    // filters can be { feature: 'chatbot', order: 'new', page: 1 }
+    // filters can be { feature: 'chatbot', order: 'new', cursor: '<X-Next-Cursor of the previous page>' }
     const response = await apiClient.get('/results', { params: filters });
-    return response.data;
+    return { items: response.data, next: response.headers['x-next-cursor'] || null };
   } catch (error) {
     console.error('Error fetching results:', error.response?.data || error.message);
     throw error;
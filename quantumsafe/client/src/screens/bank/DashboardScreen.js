@@ -84,15 +84,12 @@ const DashboardScreen = () => {
     try {
       setIsLoading(true);
       setError(null);
-      const analysisData = await uploadAndAnalyzeCsv(selectedFile);
-      setResults(analysisData);
-      
-      // Calculate summary from new data
-      const newSummary = analysisData.reduce((acc, row) => {
-        acc[row.verdict] = (acc[row.verdict] || 0) + 1;
-        return acc;
-      }, { SAFE: 0, SUSPICIOUS: 0, FRAUD: 0 });
-      setSummary(newSummary);
+      const uploadSummary = await uploadAndAnalyzeCsv(selectedFile);
+      setSummary({ SAFE: 0, SUSPICIOUS: 0, FRAUD: 0, ...uploadSummary.verdicts });
+
+      // The upload only reports counts, so reload the latest stored rows
+      const latestTransactions = await getLatestTransactions();
+      setResults(latestTransactions);
 
     } catch (e) {
       setError('Failed to analyze the file.');
@@ -20,6 +20,8 @@ const ResultsScreen = ({ navigation }) => {
         order: 'new',
     });
     const [page, setPage] = useState(1);
+    const [cursors, setCursors] = useState([null]); // cursors[i] fetches page i + 1
+    const [nextCursor, setNextCursor] = useState(null);
     const [isLoading, setIsLoading] = useState(false);
     const [error, setError] = useState('');
     const [kpiCounts, setKpiCounts] = useState({ TOTAL: 0, SAFE: 0, SUSPICIOUS: 0, FRAUD: 0 }); // Mocked for now
@@ -28,8 +30,9 @@ const ResultsScreen = ({ navigation }) => {
         setIsLoading(true);
         setError('');
         try {
-            const data = await getResults({ ...filters, page });
+            const { items: data, next } = await getResults({ ...filters, cursor: cursors[page - 1] || undefined });
             setResults(data);
+            setNextCursor(next);
             // In a real app, the API would also return the counts for the KPIs
             // For now, we simulate it based on the current page's data
             const counts = data.reduce((acc, item) => {
@@ -44,7 +47,7 @@ const ResultsScreen = ({ navigation }) => {
         } finally {
             setIsLoading(false);
         }
-    }, [filters, page]);
+    }, [filters, page, cursors]);
 
     useEffect(() => {
         fetchData();
@@ -52,6 +55,7 @@ const ResultsScreen = ({ navigation }) => {
 
     const handleFilterChange = (key, value) => {
         setFilters(prev => ({ ...prev, [key]: value }));
+        setCursors([null]);
         setPage(1); // Reset to first page on filter change
     };
 
@@ -134,7 +138,14 @@ const ResultsScreen = ({ navigation }) => {
                                 <Text style={globalStyles.buttonText}>Prev</Text>
                             </TouchableOpacity>
                             <Text style={styles.pageText}>Page {page}</Text>
-                            <TouchableOpacity style={globalStyles.button} onPress={() => setPage(p => p + 1)} disabled={results.length < 50}>
+                            <TouchableOpacity
+                                style={globalStyles.button}
+                                onPress={() => {
+                                    setCursors(c => [...c.slice(0, page), nextCursor]);
+                                    setPage(p => p + 1);
+                                }}
+                                disabled={!nextCursor}
+                            >
                                 <Text style={globalStyles.buttonText}>Next</Text>
                             </TouchableOpacity>
                         </View>
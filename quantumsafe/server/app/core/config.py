@@ -1,3 +1,4 @@
+from typing import Dict
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -7,6 +8,89 @@ class Settings(BaseSettings):
     MONGO_DETAILS: str = "mongodb://localhost:27017"
     DATABASE_NAME: str = "quantumsafe"
 
+    # CSV ingestion: bytes read from the upload per chunk and rows per insert_many call.
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    BANK_INSERT_BATCH_SIZE: int = 1000
+
+    # Payee/account profile store (one per worker process): LRU bound, where it
+    # is snapshotted on shutdown, and how often it replays new rows from Mongo,
+    # leaving out the last PROFILE_SYNC_LAG_SECONDS of rows still being inserted.
+    PROFILE_STORE_MAX_ENTRIES: int = 500_000
+    PROFILE_SNAPSHOT_PATH: str = "data/profiles.json"
+    PROFILE_SYNC_SECONDS: float = 5.0
+    PROFILE_SYNC_LAG_SECONDS: float = 10.0
+
+    # /bank/export: documents fetched per cursor batch and bytes per streamed chunk.
+    EXPORT_CURSOR_BATCH_SIZE: int = 1000
+    EXPORT_CHUNK_SIZE: int = 64 * 1024
+
+    # NDJSON batch endpoints: longest accepted input line.
+    NDJSON_MAX_LINE_BYTES: int = 1024 * 1024
+
+    # Write-behind buffer for common_analyses: flush at this many documents or
+    # after this many seconds. At most WRITE_BUFFER_MAX_PENDING are held (e.g. while Mongo is
+    # unavailable); further documents are dropped and counted.
+    WRITE_BUFFER_MAX_DOCS: int = 500
+    WRITE_BUFFER_FLUSH_SECONDS: float = 1.0
+    WRITE_BUFFER_MAX_PENDING: int = 50000
+
+    # Chatbot rule pack (empty = bundled app/data/chatbot_rules.json) and how
+    # often workers check it for changes.
+    CHATBOT_RULES_PATH: str = ""
+    CHATBOT_RULES_RELOAD_SECONDS: float = 5.0
+
+    # Image analysis process pool: concurrent jobs and how many more may wait.
+    IMAGE_POOL_WORKERS: int = 2
+    IMAGE_POOL_QUEUE_DEPTH: int = 8
+
+    # Image intake limits: upload size, decoded pixel count, and the long side
+    # (in pixels) of the copy QR decoding runs on. ELA needs the native bitmap,
+    # so an analysis peaks at about 4 bytes per pixel (+205 MB at 48 MP): the
+    # pixel cap keeps each image pool worker within a ~120 MB image budget.
+    IMAGE_MAX_BYTES: int = 20 * 1024 * 1024
+    IMAGE_MAX_PIXELS: int = 24_000_000
+    IMAGE_WORKING_MAX_SIDE: int = 2048
+
+    # Image verdict cache: in-process LRU size, entry lifetime, and whether
+    # verdicts are also shared between workers through Mongo.
+    IMAGE_CACHE_SIZE: int = 4096
+    IMAGE_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    IMAGE_CACHE_SHARED: bool = True
+
+    # Background bank CSV jobs: where uploads are spooled, how many jobs run
+    # at once (per process), and how many rows are committed per chunk. A job
+    # is leased to one process for BANK_JOB_LEASE_SECONDS, renewed while it
+    # runs; idle workers look for claimable jobs every BANK_JOB_POLL_SECONDS.
+    BANK_JOBS_DIR: str = "data/jobs"
+    BANK_JOB_WORKERS: int = 2
+    BANK_JOB_CHUNK_ROWS: int = 5000
+    BANK_JOB_LEASE_SECONDS: float = 60.0
+    BANK_JOB_POLL_SECONDS: float = 5.0
+
+    # Retention: days to keep per collection (bank_transactions,
+    # common_analyses) and per common_analyses feature, 0 or absent = forever.
+    # Expired documents are archived as gzip NDJSON under ARCHIVE_DIR, then
+    # deleted, by a sweep every RETENTION_SWEEP_SECONDS. Documents restored from
+    # the archive are not archived again; they are deleted RETENTION_RESTORED_DAYS
+    # after the restore (0 = kept).
+    # e.g. RETENTION_DAYS='{"bank_transactions": 365}' RETENTION_FEATURE_DAYS='{"chatbot": 90}'
+    RETENTION_DAYS: Dict[str, int] = {}
+    RETENTION_FEATURE_DAYS: Dict[str, int] = {}
+    RETENTION_SWEEP_SECONDS: float = 3600.0
+    RETENTION_BATCH_SIZE: int = 5000
+    RETENTION_RESTORED_DAYS: int = 0
+    ARCHIVE_DIR: str = "data/archive"
+
+    # Per-request sampling profiler: requests carrying PROFILER_HEADER (or a
+    # PROFILER_SAMPLE_RATE fraction of all requests) are profiled into a ring
+    # of at most PROFILER_MAX_FILES collapsed-stack files in PROFILER_DIR.
+    PROFILER_ENABLED: bool = False
+    PROFILER_HEADER: str = "X-Profile"
+    PROFILER_SAMPLE_RATE: float = 0.0
+    PROFILER_INTERVAL_MS: float = 5.0
+    PROFILER_DIR: str = "data/profiles"
+    PROFILER_MAX_FILES: int = 50
+
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding='utf-8')
 
 settings = Settings()
\ No newline at end of file
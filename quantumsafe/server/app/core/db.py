@@ -1,5 +1,7 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from .config import settings
+from .metrics import mongo_command_timer
+from .write_buffer import write_buffer
 
 class MongoDB:
     client: AsyncIOMotorClient = None
@@ -12,7 +14,7 @@ async def connect_to_mongo():
     Connects to the MongoDB database on application startup.
     """
     print("Connecting to MongoDB...")
-    db_manager.client = AsyncIOMotorClient(settings.MONGO_DETAILS)
+    db_manager.client = AsyncIOMotorClient(settings.MONGO_DETAILS, event_listeners=[mongo_command_timer])
     db_manager.db = db_manager.client[settings.DATABASE_NAME]
     print("Successfully connected to MongoDB!")
 
@@ -20,6 +22,8 @@ async def close_mongo_connection():
     """
     Closes the MongoDB connection on application shutdown.
     """
+    print("Draining write-behind buffer...")
+    await write_buffer.drain()
     print("Closing MongoDB connection...")
     db_manager.client.close()
     print("MongoDB connection closed.")
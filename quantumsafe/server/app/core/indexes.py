@@ -0,0 +1,48 @@
+from pymongo import IndexModel
+
+async def ensure_indexes(db):
+    """
+    Creates the indexes backing the sorted listings. create_indexes is a
+    no-op for indexes that already exist, so this runs on every startup.
+    """
+    print("Ensuring MongoDB indexes...")
+    await db["common_analyses"].create_indexes([
+        # /common/results: order=new/old, with and without a feature filter
+        IndexModel([("createdAt", -1), ("_id", -1)]),
+        IndexModel([("feature", 1), ("createdAt", -1), ("_id", -1)]),
+        # order=hi and order=lo (score direction differs, createdAt stays descending)
+        IndexModel([("score", -1), ("createdAt", -1), ("_id", -1)]),
+        IndexModel([("score", 1), ("createdAt", -1), ("_id", -1)]),
+        IndexModel([("feature", 1), ("score", -1), ("createdAt", -1), ("_id", -1)]),
+        IndexModel([("feature", 1), ("score", 1), ("createdAt", -1), ("_id", -1)]),
+    ])
+    await db["bank_transactions"].create_indexes([
+        # /bank/transactions and /bank/export
+        IndexModel([("createdAt", -1), ("_id", -1)]),
+        # /bank/export?verdict=...
+        IndexModel([("verdict", 1), ("createdAt", -1), ("_id", -1)]),
+        # Velocity windows: keyed lookups and the covered full-window scan
+        IndexModel([("payee", 1), ("ts", 1), ("amount", 1)]),
+        IndexModel([("account", 1), ("ts", 1), ("amount", 1)]),
+        IndexModel([("ts", 1), ("payee", 1), ("account", 1), ("amount", 1)]),
+        # Upload deduplication: one document per row fingerprint
+        IndexModel(
+            [("fingerprint", 1)], unique=True,
+            partialFilterExpression={"fingerprint": {"$exists": True}}
+        ),
+        # Background CSV jobs: result paging, and idempotent chunk re-runs
+        IndexModel(
+            [("job_id", 1), ("row", 1)], unique=True,
+            partialFilterExpression={"job_id": {"$exists": True}}
+        ),
+    ])
+    await db["rollups"].create_indexes([
+        # /bank/summary and /common/summary day ranges
+        IndexModel([("source", 1), ("day", 1), ("feature", 1)]),
+    ])
+    await db["bank_jobs"].create_indexes([
+        # Claiming the oldest queued job or expired lease
+        IndexModel([("status", 1), ("createdAt", 1)]),
+        # Resubmitted files
+        IndexModel([("sha256", 1)]),
+    ])
\ No newline at end of file
@@ -0,0 +1,169 @@
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from .config import settings
+
+PROFILE_NAME_RE = re.compile(r'^[0-9]{8}T[0-9]{6}_[0-9a-f]{6}_[A-Za-z0-9_.-]+\.folded$')
+
+class SamplingProfiler:
+    """
+    Samples the call stack of one thread every `interval` seconds from a
+    background thread and counts identical stacks. Nothing is hooked into
+    the interpreter, so the profiled code runs at full speed between samples.
+    """
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def merge(self, stacks: Dict[str, int], root: str):
+        """
+        Adds stacks sampled elsewhere (e.g. in a pool worker process) under
+        a `root` frame.
+        """
+        for stack, count in stacks.items():
+            self.stacks[f"{root};{stack}"] += count
+            self.samples += count
+
+    def collapsed(self) -> str:
+        """
+        Collapsed-stack ("folded") text: one `root;...;leaf count` line per
+        stack, readable by speedscope and flamegraph.pl.
+        """
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+class ProfileRing:
+    """
+    Keeps at most `max_files` profiles in `directory`, dropping the oldest.
+    """
+    def __init__(self, directory: str, max_files: int):
+        self.directory = directory
+        self.max_files = max_files
+
+    def write(self, name: str, content: str):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = os.path.join(self.directory, f".{name}.tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp, os.path.join(self.directory, name))
+        for old in self.list()[self.max_files:]:
+            try:
+                os.remove(os.path.join(self.directory, old['name']))
+            except OSError:
+                pass
+
+    def list(self) -> List[Dict]:
+        """
+        Stored profiles, newest first.
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for name in os.listdir(self.directory):
+            if PROFILE_NAME_RE.match(name):
+                st = os.stat(os.path.join(self.directory, name))
+                entries.append({'name': name, 'bytes': st.st_size, 'created': st.st_mtime})
+        return sorted(entries, key=lambda e: e['name'], reverse=True)
+
+    def path(self, name: str) -> Optional[str]:
+        if not PROFILE_NAME_RE.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+profile_ring = ProfileRing(settings.PROFILER_DIR, settings.PROFILER_MAX_FILES)
+
+# The profiler of the request being handled, if it is profiled
+active_profiler: ContextVar[Optional[SamplingProfiler]] = ContextVar("active_profiler", default=None)
+
+def profile_call(interval: float, fn, *args):
+    """
+    Runs `fn(*args)` while sampling the calling thread and returns
+    (result, stacks). Used inside pool worker processes, which the request
+    profiler cannot see; the stacks are merged into the request's profile.
+    """
+    profiler = SamplingProfiler(threading.get_ident(), interval)
+    profiler.start()
+    try:
+        result = fn(*args)
+    finally:
+        profiler.stop()
+    return result, dict(profiler.stacks)
+
+class ProfilerMiddleware:
+    """
+    Profiles a request when it carries the PROFILER_HEADER header or is
+    picked by PROFILER_SAMPLE_RATE, and only while PROFILER_ENABLED is set.
+    The event loop thread is sampled, so concurrent requests on the same
+    worker can show up in the profile too; one profile runs at a time.
+    Work the request sends to a WorkerPool is sampled inside the pool
+    process and appears under a "<pool>-pool" root frame. The profile name
+    is returned in X-Profile-Id.
+    """
+    def __init__(self, app):
+        self.app = app
+        self._busy = threading.Lock()
+        self._header = settings.PROFILER_HEADER.lower().encode('latin-1')
+
+    def _wanted(self, scope) -> bool:
+        if not settings.PROFILER_ENABLED or scope["type"] != "http":
+            return False
+        if any(k == self._header and v not in (b"", b"0") for k, v in scope.get("headers", [])):
+            return True
+        return settings.PROFILER_SAMPLE_RATE > 0 and random.random() < settings.PROFILER_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if not self._wanted(scope) or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        slug = re.sub(r'[^A-Za-z0-9]+', '-', scope["path"]).strip('-')[:60] or 'root'
+        name = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}_{os.urandom(3).hex()}_{scope['method']}_{slug}.folded"
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", name.encode('latin-1')))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        profiler = SamplingProfiler(threading.get_ident(), settings.PROFILER_INTERVAL_MS / 1000)
+        token = active_profiler.set(profiler)
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.stop()
+            active_profiler.reset(token)
+            self._busy.release()
+            if profiler.samples:
+                profile_ring.write(name, profiler.collapsed())
@@ -0,0 +1,83 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from .config import settings
+from .profiler import active_profiler, profile_call
+
+class PoolSaturatedError(RuntimeError):
+    """
+    Raised when every worker is busy and the wait queue is already full.
+    """
+
+class WorkerPool:
+    """
+    A process pool for CPU-bound analysis with a hard cap on queued work.
+    At most `workers` jobs run at once and at most `queue_depth` more wait;
+    anything beyond that is rejected straight away instead of piling up.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.executor: ProcessPoolExecutor = None
+        self.workers = 0
+        self.queue_depth = 0
+        self.in_flight = 0
+        self.rejected = 0
+
+    def start(self, workers: int, queue_depth: int):
+        self.workers = max(1, workers)
+        self.queue_depth = max(0, queue_depth)
+        # spawn keeps the children clear of the Motor client's threads
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+
+    async def run(self, fn, *args):
+        """
+        Runs `fn(*args)` in the pool, or raises PoolSaturatedError when the
+        pool already holds workers + queue_depth jobs. If the request is
+        being profiled, the worker process samples the call too.
+        """
+        if self.in_flight >= self.workers + self.queue_depth:
+            self.rejected += 1
+            raise PoolSaturatedError(f"{self.name} pool is saturated")
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            profiler = active_profiler.get()
+            if profiler is None:
+                return await loop.run_in_executor(self.executor, partial(fn, *args))
+            result, stacks = await loop.run_in_executor(
+                self.executor, partial(profile_call, profiler.interval, fn, *args)
+            )
+            profiler.merge(stacks, f"{self.name}-pool")
+            return result
+        finally:
+            self.in_flight -= 1
+
+image_pool = WorkerPool("image")
+
+def start_worker_pools():
+    """
+    Starts the analysis process pools on application startup.
+    """
+    print("Starting image analysis pool...")
+    image_pool.start(settings.IMAGE_POOL_WORKERS, settings.IMAGE_POOL_QUEUE_DEPTH)
+
+def stop_worker_pools():
+    """
+    Stops the analysis process pools on application shutdown.
+    """
+    print("Stopping image analysis pool...")
+    image_pool.shutdown()
+
+def get_image_pool() -> WorkerPool:
+    """
+    Returns the image analysis pool.
+    """
+    return image_pool
\ No newline at end of file
@@ -0,0 +1,169 @@
+import asyncio
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List
+from pymongo.errors import BulkWriteError
+
+class WriteBehindBuffer:
+    """
+    Collects documents in memory and writes them with insert_many once
+    `max_docs` are pending or `flush_seconds` have passed, so endpoints can
+    respond before their audit log entry reaches Mongo. At most
+    `max_pending` documents are held: beyond that, new documents are dropped
+    and counted in `dropped_docs`.
+    """
+    def __init__(self):
+        self.db = None
+        self.max_docs = 500
+        self.flush_seconds = 1.0
+        self.max_pending = 50000
+        self._pending: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._depth = 0
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task = None
+        self._listeners: Dict[str, List[Callable[[Any, List[Dict[str, Any]]], Awaitable]]] = defaultdict(list)
+        self.flushes = 0
+        self.flushed_docs = 0
+        self.failed_flushes = 0
+        self.failed_callbacks = 0
+        self.dropped_docs = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    def start(self, db, max_docs: int, flush_seconds: float, max_pending: int):
+        self.db = db
+        self.max_docs = max_docs
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self._task = asyncio.create_task(self._run())
+
+    def on_flush(self, collection: str, callback: Callable[[Any, List[Dict[str, Any]]], Awaitable]):
+        """
+        Registers `await callback(db, docs)` to run with the documents of
+        each flush that were inserted into `collection`.
+        """
+        self._listeners[collection].append(callback)
+
+    @property
+    def depth(self) -> int:
+        return self._depth
+
+    def add(self, collection: str, doc: Dict[str, Any]) -> bool:
+        """
+        Queues one document for `collection`. Never awaits. Returns False if
+        the buffer is full and the document was dropped.
+        """
+        if self._depth >= self.max_pending:
+            self.dropped_docs += 1
+            self._wakeup.set()
+            return False
+        self._pending[collection].append(doc)
+        self._depth += 1
+        if self._depth >= self.max_docs:
+            self._wakeup.set()
+        return True
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Keep flushing later batches rather than letting the task die
+                self.failed_flushes += 1
+                print(f"Write-behind flush failed: {e!r}")
+
+    async def flush(self):
+        async with self._lock:
+            if not self._depth:
+                return
+            pending, self._pending = self._pending, defaultdict(list)
+            self._depth = 0
+
+            start = time.perf_counter()
+            try:
+                for collection in list(pending):
+                    docs = pending[collection]
+                    try:
+                        await self.db[collection].insert_many(docs, ordered=False)
+                        inserted = docs
+                    except BulkWriteError as e:
+                        # Per-document failures are not retried; a duplicate _id means
+                        # a requeued document was already stored, anything else is dropped
+                        self.failed_flushes += 1
+                        errors = e.details.get('writeErrors', [])
+                        failed = {err['index'] for err in errors}
+                        self.dropped_docs += sum(err.get('code') != 11000 for err in errors)
+                        inserted = [doc for i, doc in enumerate(docs) if i not in failed]
+                    except Exception as e:
+                        self.failed_flushes += 1
+                        print(f"Write-behind flush to {collection} failed: {e!r}")
+                        self._requeue(collection, pending.pop(collection))
+                        continue
+                    del pending[collection]
+                    self.flushed_docs += len(inserted)
+                    for callback in self._listeners.get(collection, ()):
+                        try:
+                            await callback(self.db, inserted)
+                        except Exception as e:
+                            self.failed_callbacks += 1
+                            print(f"Write-behind flush callback for {collection} failed: {e!r}")
+            finally:
+                # Cancelled mid-flush (drain): whatever was not written yet goes back
+                for collection, docs in pending.items():
+                    self._requeue(collection, docs)
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.flushes += 1
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self.total_flush_ms += elapsed_ms
+
+    def _requeue(self, collection: str, docs: List[Dict[str, Any]]):
+        room = max(0, self.max_pending - self._depth)
+        kept = docs[-room:] if room else []
+        self.dropped_docs += len(docs) - len(kept)
+        self._pending[collection][:0] = kept
+        self._depth += len(kept)
+
+    async def drain(self):
+        """
+        Stops the background flusher and writes out everything still pending.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": self._depth,
+            "flushes": self.flushes,
+            "flushed_docs": self.flushed_docs,
+            "failed_flushes": self.failed_flushes,
+            "failed_callbacks": self.failed_callbacks,
+            "dropped_docs": self.dropped_docs,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "max_flush_ms": round(self.max_flush_ms, 3),
+            "avg_flush_ms": round(self.total_flush_ms / self.flushes, 3) if self.flushes else 0.0,
+        }
+
+write_buffer = WriteBehindBuffer()
+
+def get_write_buffer() -> WriteBehindBuffer:
+    """
+    Returns the write-behind buffer.
+    """
+    return write_buffer
@@ -1,16 +1,60 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from .core.db import connect_to_mongo, close_mongo_connection
+from functools import partial
+from .core.config import settings
+from .core.db import connect_to_mongo, close_mongo_connection, get_database
+from .core.indexes import ensure_indexes
+from .core.metrics import TimingMiddleware, registry
+from .core.profiler import ProfilerMiddleware
+from .core.workers import image_pool, start_worker_pools, stop_worker_pools
+from .core.write_buffer import write_buffer
+from .services.archive import retention_sweeper
+from .services.bank_jobs import bank_jobs
+from .services.profiles import profile_store
+from .services.rollups import apply_rollups
+from .services.rules import chatbot_rules
+from .services.verdict_cache import image_verdict_cache
 # Import routers
-from .routers import bank, common
+from .routers import archive, bank, common, debug
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # On startup
+    chatbot_rules.load(settings.CHATBOT_RULES_PATH, settings.CHATBOT_RULES_RELOAD_SECONDS)
     await connect_to_mongo()
+    await ensure_indexes(get_database())
+    profile_store.max_entries = settings.PROFILE_STORE_MAX_ENTRIES
+    profile_store.lag_seconds = settings.PROFILE_SYNC_LAG_SECONDS
+    profile_store.load_snapshot(settings.PROFILE_SNAPSHOT_PATH)
+    await profile_store.build_from_db(get_database())
+    profile_store.start(get_database(), settings.PROFILE_SYNC_SECONDS, settings.PROFILE_SYNC_LAG_SECONDS)
+    write_buffer.start(
+        get_database(), settings.WRITE_BUFFER_MAX_DOCS,
+        settings.WRITE_BUFFER_FLUSH_SECONDS, settings.WRITE_BUFFER_MAX_PENDING
+    )
+    write_buffer.on_flush("common_analyses", partial(apply_rollups, source="common"))
+    retention_sweeper.start(
+        get_database(), settings.ARCHIVE_DIR, settings.RETENTION_DAYS, settings.RETENTION_FEATURE_DAYS,
+        settings.RETENTION_BATCH_SIZE, settings.RETENTION_SWEEP_SECONDS, settings.RETENTION_RESTORED_DAYS
+    )
+    start_worker_pools()
+    await bank_jobs.start(
+        get_database(), settings.BANK_JOBS_DIR, settings.BANK_JOB_WORKERS, settings.BANK_JOB_CHUNK_ROWS,
+        settings.BANK_JOB_LEASE_SECONDS, settings.BANK_JOB_POLL_SECONDS
+    )
+    await image_verdict_cache.start(
+        settings.IMAGE_CACHE_SIZE, settings.IMAGE_CACHE_TTL_SECONDS,
+        get_database()["image_verdicts"] if settings.IMAGE_CACHE_SHARED else None
+    )
     yield
     # On shutdown
+    await bank_jobs.stop()
+    await retention_sweeper.stop()
+    stop_worker_pools()
+    await profile_store.stop()
+    profile_store.snapshot(settings.PROFILE_SNAPSHOT_PATH)
     await close_mongo_connection()
 
 app = FastAPI(
@@ -26,12 +70,35 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing", "X-Profile-Id"],
 )
+app.add_middleware(TimingMiddleware)
+app.add_middleware(ProfilerMiddleware)
+
+# State the services already track, read at scrape time
+registry.gauge("qs_write_buffer_depth", "Documents waiting in the write-behind buffer", lambda: write_buffer.depth)
+registry.gauge("qs_write_buffer_last_flush_seconds", "Duration of the last buffer flush", lambda: write_buffer.last_flush_ms / 1000)
+registry.gauge("qs_write_buffer_flushed_docs_total", "Documents flushed by the write-behind buffer", lambda: write_buffer.flushed_docs, "counter")
+registry.gauge("qs_write_buffer_dropped_docs_total", "Documents dropped because the write-behind buffer was full", lambda: write_buffer.dropped_docs, "counter")
+registry.gauge("qs_image_cache_hits_total", "Image verdict cache hits (local + shared)", lambda: image_verdict_cache.hits + image_verdict_cache.shared_hits, "counter")
+registry.gauge("qs_image_cache_misses_total", "Image verdict cache misses", lambda: image_verdict_cache.misses, "counter")
+registry.gauge("qs_image_pool_in_flight", "Image analyses running or queued", lambda: image_pool.in_flight)
+registry.gauge("qs_image_pool_rejected_total", "Image analyses rejected because the pool was full", lambda: image_pool.rejected, "counter")
+registry.gauge("qs_profile_store_entries", "Payee/account profiles held in memory", lambda: len(profile_store))
 
 @app.get("/", tags=["Root"])
 async def read_root():
     return {"message": "Welcome to the QuantumSafe API!"}
 
+@app.get("/metrics", tags=["Root"], response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus text exposition of request, stage and MongoDB latencies.
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 # Include routers
 app.include_router(bank.router, tags=["Bank"], prefix="/bank")
-app.include_router(common.router, tags=["Common"], prefix="/common")
\ No newline at end of file
+app.include_router(common.router, tags=["Common"], prefix="/common")
+app.include_router(archive.router, tags=["Archive"], prefix="/archive")
+app.include_router(debug.router, tags=["Debug"], prefix="/debug")
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 class BankTransaction(BaseModel):
@@ -10,7 +10,40 @@ class BankTransaction(BaseModel):
     verdict: str # ENUM('SAFE','SUSPICIOUS','FRAUD')
     reasons: Optional[List[str]] = None
     action: Optional[str] = None
+    ts: Optional[datetime] = None # when the transaction happened, as given in the CSV
     createdAt: datetime = Field(default_factory=datetime.utcnow)
 
 class BankTransactionInDB(BankTransaction):
-    id: str = Field(alias="_id")
\ No newline at end of file
+    id: str = Field(alias="_id")
+
+class BankUploadBatch(BaseModel):
+    batch: int
+    rows: int
+    inserted: int
+    duplicates: int = 0 # rows already stored, skipped without scoring
+    verdicts: Dict[str, int]
+
+class BankJob(BaseModel):
+    id: str
+    filename: str
+    status: str # ENUM('queued','running','done','failed')
+    rows: int = 0
+    inserted: int = 0
+    duplicates: int = 0
+    verdicts: Dict[str, int] = Field(default_factory=dict)
+    bytes_done: int = 0
+    bytes_total: int = 0
+    rows_per_second: float = 0.0
+    error: Optional[str] = None
+    createdAt: datetime
+    finishedAt: Optional[datetime] = None
+
+class BankUploadSummary(BaseModel):
+    filename: str
+    sha256: Optional[str] = None
+    duplicate_file: bool = False # identical to an earlier upload; its summary is returned
+    rows: int = 0
+    inserted: int = 0
+    duplicates: int = 0
+    verdicts: Dict[str, int] = Field(default_factory=lambda: {'SAFE': 0, 'SUSPICIOUS': 0, 'FRAUD': 0})
+    batches: List[BankUploadBatch] = Field(default_factory=list)
\ No newline at end of file
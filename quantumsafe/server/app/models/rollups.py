@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import Dict, List
+
+class RollupDay(BaseModel):
+    day: str
+    total: int
+    verdicts: Dict[str, int]
+
+class RollupSummary(BaseModel):
+    source: str # 'bank' or 'common'
+    from_day: str
+    to_day: str
+    total: int
+    average_score: float
+    verdicts: Dict[str, int]
+    features: Dict[str, int]
+    scores: Dict[str, int] # score histogram, keyed by bucket lower bound
+    days: List[RollupDay]
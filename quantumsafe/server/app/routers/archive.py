@@ -0,0 +1,89 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import Dict, Optional
+from bson import json_util
+from ..core.config import settings
+from ..core.db import get_database
+from ..services.archive import (
+    ARCHIVED_COLLECTIONS,
+    get_retention_sweeper,
+    iter_archive,
+    list_partitions,
+    restore_range,
+)
+
+router = APIRouter()
+
+def _range(collection: str, from_date: str, to_date: Optional[str]):
+    if collection not in ARCHIVED_COLLECTIONS:
+        raise HTTPException(status_code=404, detail="No archive for this collection.")
+    to_date = to_date or from_date
+    try:
+        datetime.strptime(from_date, '%Y-%m-%d')
+        datetime.strptime(to_date, '%Y-%m-%d')
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD.")
+    return from_date, to_date
+
+def _filters(feature, verdict, account, payee) -> Dict:
+    values = {'feature': feature, 'verdict': verdict.upper() if verdict else None, 'account': account, 'payee': payee}
+    return {k: v for k, v in values.items() if v}
+
+@router.get("")
+async def archive_overview(sweeper=Depends(get_retention_sweeper)):
+    """
+    Retention sweep stats and the archived days of each collection.
+    """
+    return {
+        'sweeper': sweeper.stats(),
+        'collections': {c: list_partitions(settings.ARCHIVE_DIR, c) for c in ARCHIVED_COLLECTIONS},
+    }
+
+@router.get("/{collection}")
+async def read_archive(
+    collection: str,
+    from_date: str,
+    to_date: Optional[str] = None,
+    feature: Optional[str] = None,
+    verdict: Optional[str] = None,
+    account: Optional[str] = None,
+    payee: Optional[str] = None,
+    limit: int = 0,
+):
+    """
+    Streams archived documents of a day range as NDJSON (extended JSON),
+    optionally filtered by feature, verdict, account or payee.
+    `limit=0` returns everything in the range.
+    """
+    from_date, to_date = _range(collection, from_date, to_date)
+    filters = _filters(feature, verdict, account, payee)
+
+    def lines():
+        for i, doc in enumerate(iter_archive(settings.ARCHIVE_DIR, collection, from_date, to_date, filters)):
+            if limit and i >= limit:
+                return
+            yield json_util.dumps(doc).encode('utf-8') + b'\n'
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@router.post("/{collection}/restore")
+async def restore_archive(
+    collection: str,
+    from_date: str,
+    to_date: Optional[str] = None,
+    feature: Optional[str] = None,
+    verdict: Optional[str] = None,
+    account: Optional[str] = None,
+    payee: Optional[str] = None,
+    db=Depends(get_database)
+):
+    """
+    Re-imports an archived day range (optionally filtered) into the live
+    collection.
+    """
+    from_date, to_date = _range(collection, from_date, to_date)
+    read, inserted = await restore_range(
+        db, settings.ARCHIVE_DIR, collection, from_date, to_date, _filters(feature, verdict, account, payee)
+    )
+    return {'read': read, 'inserted': inserted}
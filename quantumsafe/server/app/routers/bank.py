@@ -1,122 +1,198 @@
-import csv
-import io
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from datetime import datetime
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Request
 from fastapi.responses import StreamingResponse
-from typing import List
+from typing import List, Optional
+from ..core.config import settings
 from ..core.db import get_database
-from ..models.bank import BankTransaction
-from ..services.analysis import analyze_bank_transaction_row
-import datetime
-from ..services.csv_handler import process_bank_csv # Import the new service
+from ..models.bank import BankJob, BankTransaction, BankUploadBatch, BankUploadSummary
+from ..models.rollups import RollupSummary
+from ..services.bank_jobs import BankJobRunner, get_bank_jobs
+from ..services.csv_handler import hash_upload, process_bank_csv, store_bank_batch
+from ..services.export import EXPORT_FIELDS, gzip_chunks, iter_export_chunks
+from ..services.pagination import SORT_ORDERS, apply_cursor, encode_cursor
+from ..services.rollups import summarize
+from ..services.serialization import lean_response, projection
 
 router = APIRouter()
 
+TRANSACTION_FIELDS = list(BankTransaction.model_fields)
 
-@router.post("/upload", response_model=List[BankTransaction])
+
+@router.post("/upload", response_model=BankUploadSummary)
 async def upload_and_analyze_csv(file: UploadFile = File(...), db=Depends(get_database)):
     """
-    Receives a CSV file, analyzes each transaction, saves it to the database,
-    and returns the analysis results.
+    Receives a CSV file and streams it through the analyzer in chunks, saving
+    each batch of new rows with one bulk upsert. A file identical to an
+    earlier upload returns that upload's summary, and rows already stored
+    are counted as duplicates instead of being scored again. Returns
+    per-batch row counts and verdict totals rather than the rows themselves.
+    """
+    digest = await hash_upload(file, settings.UPLOAD_CHUNK_SIZE)
+    previous = await db["bank_uploads"].find_one({'_id': digest})
+    if previous is not None:
+        return BankUploadSummary(**{**previous['summary'], 'filename': file.filename, 'duplicate_file': True})
+
+    summary = BankUploadSummary(filename=file.filename, sha256=digest)
+
+    batches = process_bank_csv(file, db, settings.BANK_INSERT_BATCH_SIZE, settings.UPLOAD_CHUNK_SIZE)
+    async for batch, rows in batches:
+        inserted, verdicts = await store_bank_batch(db, batch)
+
+        summary.rows += rows
+        summary.inserted += inserted
+        summary.duplicates += rows - inserted
+        for verdict, count in verdicts.items():
+            summary.verdicts[verdict] = summary.verdicts.get(verdict, 0) + count
+        summary.batches.append(BankUploadBatch(
+            batch=len(summary.batches) + 1, rows=rows, inserted=inserted,
+            duplicates=rows - inserted, verdicts=verdicts
+        ))
+
+    await db["bank_uploads"].replace_one(
+        {'_id': digest},
+        {'filename': file.filename, 'summary': summary.model_dump(), 'createdAt': datetime.utcnow()},
+        upsert=True
+    )
+    return summary
+
+
+@router.post("/jobs", response_model=BankJob, status_code=202)
+async def create_analysis_job(file: UploadFile = File(...), jobs: BankJobRunner = Depends(get_bank_jobs)):
+    """
+    Spools a (large) CSV to disk and analyzes it in the background. Returns
+    the job straight away; poll GET /bank/jobs/{id} for progress. Submitting
+    a file identical to an earlier, not failed job returns that job.
     """
-    if not file.filename.endswith('.csv'):
-        raise HTTPException(status_code=400, detail="Invalid file type. Please upload a CSV.")
+    job = await jobs.submit(file, settings.UPLOAD_CHUNK_SIZE)
+    return await jobs.get(job['_id'])
 
-    contents = await file.read()
-    file_stream = io.StringIO(contents.decode('utf-8'))
-    reader = csv.reader(file_stream)
 
-    try:
-        headers = [h.lower() for h in next(reader)]
-    except StopIteration:
-        raise HTTPException(status_code=400, detail="CSV file is empty.")
-
-    processed_rows = []
-    
-    for row_data in reader:
-        row_dict = dict(zip(headers, row_data))
-
-        # Check if CSV already has model outputs
-        has_analysis = all(k in row_dict for k in ['score', 'verdict', 'reasons', 'action'])
-
-        if has_analysis:
-            # Use CSV values as-is
-            verdict = str(row_dict.get('verdict', 'SAFE')).strip().upper()
-            reasons_raw = str(row_dict.get('reasons', '')).strip()
-            
-            if '•' in reasons_raw:
-                reasons = [r.strip() for r in reasons_raw.split('•')]
-            else:
-                reasons = [r.strip() for r in reasons_raw.split(',')]
-            
-            analysis_result = {
-                'account': str(row_dict.get('account', '')).strip(),
-                'payee': str(row_dict.get('payee', '')).strip().lower(),
-                'amount': float(row_dict.get('amount', 0)),
-                'ts': str(row_dict.get('ts', '')).strip() or datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
-                'score': int(row_dict.get('score', 0)),
-                'verdict': verdict,
-                'reasons': reasons,
-                'action': str(row_dict.get('action', 'Allow • Monitor')).strip()
-            }
-        else:
-            # Fallback to mock analyzer
-            analysis_result = analyze_bank_transaction_row(row_dict)
-        
-        # Create a Pydantic model instance for validation and DB insertion
-        transaction_to_save = BankTransaction(**analysis_result)
-        
-        # Insert into MongoDB
-        await db["bank_transactions"].insert_one(transaction_to_save.model_dump(by_alias=True))
-        
-        processed_rows.append(transaction_to_save)
-
-    return processed_rows
+@router.get("/jobs/{job_id}", response_model=BankJob)
+async def get_analysis_job(job_id: str, jobs: BankJobRunner = Depends(get_bank_jobs)):
+    """
+    Reports a job's progress: rows done, throughput and verdicts so far.
+    """
+    job = await jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+
+@router.get("/jobs/{job_id}/results", response_model=List[BankTransaction])
+async def get_analysis_job_results(
+    job_id: str, request: Request, limit: int = 100, cursor: Optional[str] = None, db=Depends(get_database)
+):
+    """
+    Pages through a job's stored results in CSV order, including while the
+    job is still running. Pass the X-Next-Cursor response header back as
+    `cursor` for the next page.
+    """
+    query = {'job_id': job_id}
+    if cursor:
+        try:
+            query['row'] = {'$gt': int(cursor)}
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor.")
 
+    find = db["bank_transactions"].find(query, projection(TRANSACTION_FIELDS, 'row'))
+    results = await find.sort('row', 1).limit(limit).to_list(length=limit)
+    headers = {"X-Next-Cursor": str(results[-1]['row'])} if results else None
+    return lean_response(request, results, TRANSACTION_FIELDS, headers)
 
 
 @router.get("/transactions", response_model=List[BankTransaction])
-async def get_latest_transactions(limit: int = 25, db=Depends(get_database)):
+async def get_latest_transactions(
+    request: Request, limit: int = 25, cursor: Optional[str] = None, db=Depends(get_database)
+):
     """
     Fetches the most recent transactions from the database, similar to the
-    initial page load in the PHP version.
+    initial page load in the PHP version. Older pages are reached by passing
+    the X-Next-Cursor response header back as `cursor`. Send
+    `Accept: application/msgpack` for a msgpack body.
     """
-    transactions_cursor = db["bank_transactions"].find().sort("createdAt", -1).limit(limit)
+    try:
+        query = apply_cursor({}, 'new', cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    transactions_cursor = (
+        db["bank_transactions"].find(query, projection(TRANSACTION_FIELDS, '_id'))
+        .sort(SORT_ORDERS['new']).limit(limit)
+    )
     transactions = await transactions_cursor.to_list(length=limit)
-    return transactions
+
+    headers = None
+    if len(transactions) == limit:
+        headers = {"X-Next-Cursor": encode_cursor(transactions[-1], 'new')}
+    return lean_response(request, transactions, TRANSACTION_FIELDS, headers)
+
+
+@router.get("/summary", response_model=RollupSummary)
+async def get_transactions_summary(
+    from_date: Optional[str] = None, to_date: Optional[str] = None, db=Depends(get_database)
+):
+    """
+    Dashboard counts by verdict and day plus the score histogram, read from
+    the rollups kept up to date on every upload. Defaults to the last 30 days.
+    """
+    try:
+        for value in (from_date, to_date):
+            if value:
+                datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD.")
+    return await summarize(db, 'bank', from_date, to_date)
 
 
 @router.get("/export")
-async def export_results_to_csv(limit: int = 1000, db=Depends(get_database)):
+async def export_results_to_csv(
+    limit: int = 1000,
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+    verdict: Optional[str] = None,
+    format: str = 'csv',
+    gzip: bool = False,
+    db=Depends(get_database)
+):
     """
-    Exports the latest transaction analysis results to a CSV file.
+    Streams the latest transaction analysis results as CSV or NDJSON,
+    optionally gzip-compressed. Rows are read from the cursor and written out
+    as they arrive; `limit=0` exports everything matching the filters.
+    `verdict` takes one or more comma-separated verdicts.
     """
-    transactions_cursor = db["bank_transactions"].find().sort("createdAt", -1).limit(limit)
-    transactions = await transactions_cursor.to_list(length=limit)
+    if format not in ('csv', 'ndjson'):
+        raise HTTPException(status_code=400, detail="format must be 'csv' or 'ndjson'.")
+
+    query = {}
+    try:
+        if from_date:
+            query['createdAt'] = {'$gte': datetime.fromisoformat(from_date)}
+        if to_date:
+            query.setdefault('createdAt', {})['$lte'] = datetime.fromisoformat(to_date + "T23:59:59")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD.")
+    if verdict:
+        query['verdict'] = {'$in': [v.strip().upper() for v in verdict.split(',') if v.strip()]}
+
+    projection = {field: 1 for field in EXPORT_FIELDS}
+    projection['_id'] = 0
+    transactions_cursor = (
+        db["bank_transactions"].find(query, projection)
+        .sort(SORT_ORDERS['new'])
+        .limit(max(0, limit))
+        .batch_size(settings.EXPORT_CURSOR_BATCH_SIZE)
+    )
+
+    body = iter_export_chunks(transactions_cursor, format, settings.EXPORT_CHUNK_SIZE)
+    filename = f"quantumsafe_analysis_export.{format}"
+    media_type = "text/csv" if format == 'csv' else "application/x-ndjson"
+    if gzip:
+        body = gzip_chunks(body)
+        filename += ".gz"
+        media_type = "application/gzip"
 
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    headers = ['account', 'payee', 'amount', 'score', 'verdict', 'reasons', 'action', 'createdAt']
-    writer.writerow(headers)
-
-    # Write rows
-    for tx in transactions:
-        writer.writerow([
-            tx.get('account'),
-            tx.get('payee'),
-            tx.get('amount'),
-            tx.get('score'),
-            tx.get('verdict'),
-            ' • '.join(tx.get('reasons', [])),
-            tx.get('action'),
-            tx.get('createdAt').strftime('%Y-%m-%d %H:%M:%S') if tx.get('createdAt') else ''
-        ])
-
-    output.seek(0)
-    
     return StreamingResponse(
-        output,
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=quantumsafe_analysis_export.csv"}
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
\ No newline at end of file
@@ -1,20 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Body
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Body, Request
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 import csv
 import io
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 
+from ..core.config import settings
 from ..core.db import get_database
+from ..core.metrics import record_stage, rows_processed, stage
+from ..core.workers import PoolSaturatedError, get_image_pool
+from ..core.write_buffer import get_write_buffer
+from ..services.ndjson import DuplexStreamingResponse, dump_lines, iter_ndjson
+from ..services.rules import chatbot_rules
+from ..services.pagination import SORT_ORDERS, apply_cursor, encode_cursor
+from ..services.verdict_cache import get_image_verdict_cache
 from ..models.common import CommonAnalysis
+from ..models.rollups import RollupSummary
 from ..services.analysis import (
     analyze_chatbot_request,
     analyze_microfraud_transactions,
-    analyze_image_heuristics
+    analyze_image_with_timings,
+    image_dimensions,
+    analyze_velocity_windows,
+    parse_microfraud_text
 )
+from ..services.rollups import summarize
+from ..services.serialization import lean_response, projection
+from ..services.velocity import compute_velocity
 
 router = APIRouter()
 
+ANALYSIS_FIELDS = list(CommonAnalysis.model_fields)
+
 # --- Chatbot Endpoint ---
 class ChatbotRequest(BaseModel):
     message: str
@@ -23,87 +40,273 @@ class ChatbotRequest(BaseModel):
     relationship: Optional[str] = "unknown"
     history: Optional[int] = 0
 
+def _chatbot_analysis(request: ChatbotRequest) -> Dict[str, Any]:
+    rows_processed.inc('chatbot')
+    with stage('chatbot', 'score'):
+        result = analyze_chatbot_request(
+            request.message, request.upi, request.amount, request.relationship, request.history
+        )
+    return {
+        'feature': 'chatbot',
+        'inputValue': f"msg: {request.message[:120]}... | upi: {request.upi}",
+        'score': result['trust'],
+        'verdict': result['verdict'],
+        'reasons': result['reasons'],
+        'action': result['action'],
+        'createdAt': datetime.utcnow()
+    }
+
 @router.post("/chatbot", response_model=CommonAnalysis)
-async def chatbot_analyzer(request: ChatbotRequest, db=Depends(get_database)):
-    result = analyze_chatbot_request(
-        request.message, request.upi, request.amount, request.relationship, request.history
-    )
-    analysis_to_save = CommonAnalysis(
-        feature='chatbot',
-        inputValue=f"msg: {request.message[:120]}... | upi: {request.upi}",
-        score=result['trust'],
-        verdict=result['verdict'],
-        reasons=result['reasons'],
-        action=result['action']
-    )
-    await db["common_analyses"].insert_one(analysis_to_save.model_dump())
+async def chatbot_analyzer(request: ChatbotRequest, buffer=Depends(get_write_buffer)):
+    analysis = _chatbot_analysis(request)
+    with stage('chatbot', 'validate'):
+        analysis_to_save = CommonAnalysis(**analysis)
+    buffer.add("common_analyses", analysis_to_save.model_dump())
     return analysis_to_save
 
+@router.post("/chatbot/batch")
+async def chatbot_batch_analyzer(request: Request, buffer=Depends(get_write_buffer)):
+    """
+    Scores an NDJSON body with one chatbot request per line and streams back
+    one NDJSON result per line as it is parsed. An optional `id` field on a
+    line is echoed back; invalid lines produce an `error` result.
+    """
+    async def results():
+        async for records in iter_ndjson(request.stream(), settings.NDJSON_MAX_LINE_BYTES):
+            out = []
+            for line_no, value, error in records:
+                if error is None:
+                    try:
+                        chat_request = ChatbotRequest.model_validate(value)
+                    except ValidationError as e:
+                        error = str(e)
+                if error is not None:
+                    out.append({'line': line_no, 'error': error})
+                    continue
+                analysis = _chatbot_analysis(chat_request)
+                out.append({'line': line_no, 'id': value.get('id'), **analysis})
+                buffer.add("common_analyses", analysis)
+            if out:
+                yield dump_lines(out)
+
+    return DuplexStreamingResponse(results(), media_type="application/x-ndjson")
+
+@router.get("/chatbot/rules")
+async def chatbot_rules_info():
+    return chatbot_rules.info()
+
+@router.post("/chatbot/rules/reload")
+async def reload_chatbot_rules():
+    chatbot_rules.reload()
+    return chatbot_rules.info()
+
 # --- Micro-fraud Endpoint ---
 class MicrofraudRequest(BaseModel):
     transactions_text: str
 
+def _microfraud_analysis(res: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'feature': 'microfraud',
+        'inputValue': f"{res['payee']} ({res['count']} txns, ₹{res['total']})",
+        'score': res['trust'],
+        'verdict': res['verdict'],
+        'reasons': res['reasons'],
+        'action': None,
+        'createdAt': datetime.utcnow()
+    }
+
 @router.post("/microfraud")
-async def microfraud_analyzer(request: MicrofraudRequest, db=Depends(get_database)):
-    lines = request.transactions_text.strip().split('\n')
-    transactions = []
-    for line in lines:
-        try:
-            parts = [p.strip() for p in line.split(',')]
-            if len(parts) >= 3:
-                transactions.append({'date': parts[0], 'payee': parts[1], 'amount': float(parts[2])})
-        except (ValueError, IndexError):
-            continue
-    
-    results = analyze_microfraud_transactions(transactions)
-    # Save each result to DB
-    for res in results:
-        analysis_to_save = CommonAnalysis(
-            feature='microfraud',
-            inputValue=f"{res['payee']} ({res['count']} txns, ₹{res['total']})",
-            score=res['trust'],
-            verdict=res['verdict'],
-            reasons=res['reasons']
-        )
-        await db["common_analyses"].insert_one(analysis_to_save.model_dump())
+async def microfraud_analyzer(request: MicrofraudRequest, buffer=Depends(get_write_buffer)):
+    with stage('microfraud', 'parse'):
+        transactions = parse_microfraud_text(request.transactions_text)
+    rows_processed.inc('microfraud', amount=len(transactions))
+    with stage('microfraud', 'score'):
+        results = analyze_microfraud_transactions(transactions)
+    # Queue each result for the audit log
+    with stage('microfraud', 'validate'):
+        for res in results:
+            analysis_to_save = CommonAnalysis(**_microfraud_analysis(res))
+            buffer.add("common_analyses", analysis_to_save.model_dump())
         
     return results
 
+@router.post("/microfraud/batch")
+async def microfraud_batch_analyzer(request: Request, buffer=Depends(get_write_buffer)):
+    """
+    Scores an NDJSON body where each line is one micro-fraud check, given
+    either as `transactions_text` or as a `transactions` list of
+    {date, payee, amount}. Streams back one NDJSON line per input line.
+    """
+    async def results():
+        async for records in iter_ndjson(request.stream(), settings.NDJSON_MAX_LINE_BYTES):
+            out = []
+            for line_no, value, error in records:
+                if error is None and not isinstance(value, dict):
+                    error = "Each line must be a JSON object"
+                if error is None:
+                    if isinstance(value.get('transactions'), list):
+                        transactions = value['transactions']
+                        if not all(isinstance(t, dict) for t in transactions):
+                            error = "Each transaction must be a JSON object"
+                    elif isinstance(value.get('transactions_text'), str):
+                        transactions = parse_microfraud_text(value['transactions_text'])
+                    else:
+                        error = "Expected 'transactions' or 'transactions_text'"
+                if error is None:
+                    try:
+                        groups = analyze_microfraud_transactions(transactions)
+                    except (ValueError, TypeError, KeyError) as e:
+                        error = f"Invalid transactions: {e}"
+                if error is not None:
+                    out.append({'line': line_no, 'error': error})
+                    continue
+                out.append({'line': line_no, 'id': value.get('id'), 'results': groups})
+                for res in groups:
+                    buffer.add("common_analyses", _microfraud_analysis(res))
+            if out:
+                yield dump_lines(out)
+
+    return DuplexStreamingResponse(results(), media_type="application/x-ndjson")
+
+@router.get("/microfraud/velocity")
+async def microfraud_velocity(
+    group_by: str = 'payee',
+    keys: Optional[str] = None,
+    at: Optional[str] = None,
+    limit: int = 100,
+    db=Depends(get_database)
+):
+    """
+    Micro-fraud over stored bank transactions: count, total and average per
+    payee or account over the last 1h/24h/7d, scored with the micro-fraud
+    rules. `keys` restricts to comma-separated payees/accounts and `at`
+    moves the window end (defaults to now).
+    """
+    try:
+        now = datetime.fromisoformat(at) if at else None
+        key_list = [k.strip().lower() if group_by == 'payee' else k.strip() for k in keys.split(',')] if keys else None
+        groups = await compute_velocity(db, group_by, now, key_list, max(1, min(limit, 1000)))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return analyze_velocity_windows(groups)
+
 # --- Image Analyzer Endpoint ---
+async def _read_image_upload(file: UploadFile) -> bytes:
+    """
+    Reads an image upload in chunks, rejecting it with 413 as soon as it
+    passes IMAGE_MAX_BYTES or its header declares more than IMAGE_MAX_PIXELS.
+    """
+    too_large = HTTPException(
+        status_code=413, detail=f"Image exceeds {settings.IMAGE_MAX_BYTES // (1024 * 1024)} MB."
+    )
+    if file.size is not None and file.size > settings.IMAGE_MAX_BYTES:
+        raise too_large
+    chunks, size = [], 0
+    while chunk := await file.read(settings.UPLOAD_CHUNK_SIZE):
+        size += len(chunk)
+        if size > settings.IMAGE_MAX_BYTES:
+            raise too_large
+        chunks.append(chunk)
+    contents = b''.join(chunks)
+
+    dimensions = image_dimensions(contents) if contents else None
+    if dimensions and dimensions[0] * dimensions[1] > settings.IMAGE_MAX_PIXELS:
+        raise HTTPException(
+            status_code=413, detail=f"Image exceeds {settings.IMAGE_MAX_PIXELS / 1e6:g} megapixels."
+        )
+    return contents
+
 @router.post("/analyze-image", response_model=CommonAnalysis)
 async def analyze_image(
     file: UploadFile = File(...),
     qr_text: Optional[str] = Form(None),
     section: str = Form("screenshot"),
-    db=Depends(get_database)
+    buffer=Depends(get_write_buffer),
+    pool=Depends(get_image_pool),
+    cache=Depends(get_image_verdict_cache)
 ):
-    contents = await file.read()
+    with stage('image', 'read'):
+        contents = await _read_image_upload(file)
     if not contents:
         raise HTTPException(status_code=400, detail="Empty file uploaded.")
     
-    result = analyze_image_heuristics(contents, qr_text)
+    # Repeat uploads of the same image + QR text reuse the stored verdict without decoding
+    with stage('image', 'cache'):
+        cache_key = cache.make_key(contents, qr_text)
+        result = await cache.get(cache_key)
+    if result is None:
+        # Decode/ELA are CPU-bound, so they run in the process pool off the event loop
+        try:
+            with stage('image', 'pool'):
+                result, timings = await pool.run(
+                    analyze_image_with_timings, contents, qr_text,
+                    settings.IMAGE_WORKING_MAX_SIDE, settings.IMAGE_MAX_PIXELS
+                )
+            for name, seconds in timings.items():
+                record_stage('image', name, seconds)
+        except PoolSaturatedError:
+            raise HTTPException(
+                status_code=503, detail="Image analysis is busy, please retry shortly.",
+                headers={"Retry-After": "1"}
+            )
+        await cache.set(cache_key, result)
     
     analysis_to_save = CommonAnalysis(
         feature=section,
-        inputValue=f"{file.filename} | QR: {qr_text or 'N/A'}",
+        inputValue=f"{file.filename} | QR: {result.get('qr_text') or qr_text or 'N/A'}",
         score=result['trust'],
         verdict=result['verdict'],
         reasons=result['reasons']
     )
-    await db["common_analyses"].insert_one(analysis_to_save.model_dump())
+    buffer.add("common_analyses", analysis_to_save.model_dump())
     return analysis_to_save
 
+@router.get("/write-buffer/stats")
+async def write_buffer_stats(buffer=Depends(get_write_buffer)):
+    return buffer.stats()
+
+@router.get("/analyze-image/cache-stats")
+async def image_cache_stats(cache=Depends(get_image_verdict_cache)):
+    return cache.stats()
+
+@router.get("/summary", response_model=RollupSummary)
+async def get_analysis_summary(
+    feature: Optional[str] = None,
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+    db=Depends(get_database)
+):
+    """
+    Counts by verdict, feature and day plus the score histogram of stored
+    analyses, read from the rollups. Defaults to the last 30 days.
+    """
+    try:
+        for value in (from_date, to_date):
+            if value:
+                datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD.")
+    return await summarize(db, 'common', from_date, to_date, feature)
+
 # --- Results Viewer Endpoint ---
 @router.get("/results", response_model=List[CommonAnalysis])
 async def get_analysis_results(
+    request: Request,
     feature: Optional[str] = None,
     from_date: Optional[str] = None,
     to_date: Optional[str] = None,
     order: str = 'new',
     page: int = 1,
     limit: int = 50,
+    cursor: Optional[str] = None,
     db=Depends(get_database)
 ):
+    """
+    Lists stored analyses. Pages are keyset-paginated: pass the
+    X-Next-Cursor header of one response as `cursor` to get the next page.
+    `page` is only honoured (via skip) when no cursor is given. Send
+    `Accept: application/msgpack` for a msgpack body.
+    """
     query = {}
     if feature and feature != 'all':
         query['feature'] = feature
@@ -112,15 +315,19 @@ async def get_analysis_results(
     if to_date:
         query.setdefault('createdAt', {})['$lte'] = datetime.fromisoformat(to_date + "T23:59:59")
 
-    sort_order = [("createdAt", -1)]
-    if order == 'old':
-        sort_order = [("createdAt", 1)]
-    elif order == 'hi':
-        sort_order = [("score", -1), ("createdAt", -1)]
-    elif order == 'lo':
-        sort_order = [("score", 1), ("createdAt", -1)]
-
-    skip = (page - 1) * limit
-    cursor = db["common_analyses"].find(query).sort(sort_order).skip(skip).limit(limit)
-    results = await cursor.to_list(length=limit)
-    return results
\ No newline at end of file
+    if order not in SORT_ORDERS:
+        order = 'new'
+    try:
+        query = apply_cursor(query, order, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    find = db["common_analyses"].find(query, projection(ANALYSIS_FIELDS, '_id')).sort(SORT_ORDERS[order])
+    if not cursor and page > 1:
+        find = find.skip((page - 1) * limit)
+    results = await find.limit(limit).to_list(length=limit)
+
+    headers = None
+    if len(results) == limit:
+        headers = {"X-Next-Cursor": encode_cursor(results[-1], order)}
+    return lean_response(request, results, ANALYSIS_FIELDS, headers)
\ No newline at end of file
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+from ..core.config import settings
+from ..core.profiler import profile_ring
+
+router = APIRouter()
+
+def _require_profiler():
+    if not settings.PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled.")
+
+@router.get("/profiles")
+async def list_profiles():
+    """
+    Lists the stored request profiles, newest first.
+    """
+    _require_profiler()
+    return profile_ring.list()
+
+@router.get("/profiles/{name}")
+async def download_profile(name: str):
+    """
+    Downloads one profile in collapsed-stack format (open it in speedscope).
+    """
+    _require_profiler()
+    path = profile_ring.path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    return FileResponse(path, media_type="text/plain", filename=name)
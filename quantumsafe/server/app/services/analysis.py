@@ -1,10 +1,39 @@
 import random
-import re
 import hashlib
+import time
 from datetime import datetime
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
 from PIL import Image, ExifTags
 import io
+from .rules import chatbot_rules
+
+try:
+    import cv2
+except ImportError:  # QR codes are then only read from the client's qr_text
+    cv2 = None
+
+BANK_REASON_POOL = (
+    "High transaction amount", "Suspicious payee pattern", "Unusual time of transfer",
+    "Repeated payments detected", "New/unknown payee", "Risky invoice-like pattern",
+    "Potential phishing QR/invoice"
+)
+
+BANK_ACTIONS = {
+    'FRAUD': "HOLD & VERIFY KYC • Block payee • Call customer",
+    'SUSPICIOUS': "Manual review • OTP confirm • Call-back verification",
+    'SAFE': "Allow • Monitor"
+}
+
+
+def bank_verdict(score: int) -> str:
+    """Maps a bank risk score to its verdict (≥70 FRAUD, ≥40 SUSPICIOUS)."""
+    if score >= 70:
+        return "FRAUD"
+    if score >= 40:
+        return "SUSPICIOUS"
+    return "SAFE"
 
 
 def analyze_bank_transaction_row(row: Dict[str, Any]) -> Dict[str, Any]:
@@ -28,34 +57,140 @@ def analyze_bank_transaction_row(row: Dict[str, Any]) -> Dict[str, Any]:
         ts = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
 
     score = random.randint(5, 95)
+    verdict = bank_verdict(score)
+    reasons = random.sample(BANK_REASON_POOL, k=random.randint(1, 3))
+    action = BANK_ACTIONS[verdict]
 
-    if score >= 70:
-        verdict = "FRAUD"
-    elif score >= 40:
-        verdict = "SUSPICIOUS"
-    else:
-        verdict = "SAFE"
+    return {
+        'account': account, 'payee': payee, 'amount': amount, 'ts': ts,
+        'score': score, 'verdict': verdict, 'reasons': reasons, 'action': action
+    }
 
-    reason_pool = [
-        "High transaction amount", "Suspicious payee pattern", "Unusual time of transfer",
-        "Repeated payments detected", "New/unknown payee", "Risky invoice-like pattern",
-        "Potential phishing QR/invoice"
-    ]
-    random.shuffle(reason_pool)
-    reasons = random.sample(reason_pool, k=random.randint(1, 3))
 
-    if verdict == "FRAUD":
-        action = "HOLD & VERIFY KYC • Block payee • Call customer"
-    elif verdict == "SUSPICIOUS":
-        action = "Manual review • OTP confirm • Call-back verification"
+def parse_bank_timestamps(values: List[Any]) -> pd.DatetimeIndex:
+    """
+    Parses ISO 8601 timestamps in one call. Values with different offsets
+    and naive values (taken as UTC) may be mixed; all come back as naive UTC,
+    like the rest of the app's datetimes. Unparseable values become NaT.
+    """
+    cleaned = ['' if v is None else str(v).strip() for v in values]
+    # pandas' ISO8601 parser gives a naive value the offset of the aware value
+    # before it, so naive and aware values are parsed as separate groups.
+    aware = np.array([v[-1:] in ('Z', 'z') or '+' in v[10:] or '-' in v[10:] for v in cleaned], dtype=bool)
+    if aware.all() or not aware.any():
+        return pd.to_datetime(cleaned, format='ISO8601', utc=True, errors='coerce').tz_convert(None)
+    parsed = np.full(len(cleaned), np.datetime64('NaT'), dtype='datetime64[ns]')
+    for mask in (aware, ~aware):
+        group = pd.to_datetime([v for v, m in zip(cleaned, mask) if m], format='ISO8601', utc=True, errors='coerce')
+        parsed[mask] = group.tz_convert(None).as_unit('ns').to_numpy()
+    return pd.DatetimeIndex(parsed)
+
+
+def _score_bank_columns(
+    account: List[str], payee: List[str], amount: np.ndarray, ts: pd.DatetimeIndex,
+    rng: np.random.Generator, profiles=None
+) -> Dict[str, Any]:
+    """
+    Scores normalised columns and returns score, verdict, reasons and action
+    as lists, with the same rules as analyze_bank_transaction_row.
+    """
+    n = len(account)
+    score = rng.integers(5, 96, size=n)
+    signals = None
+    if profiles is not None:
+        signals = _profile_signals(profiles, account, payee, amount, ts)
+        risk = signals @ np.array([w for _, w in PROFILE_SIGNALS])
+        score = np.minimum(95, score + risk)
+    verdict = np.select([score >= 70, score >= 40], ["FRAUD", "SUSPICIOUS"], "SAFE").tolist()
+
+    # Pick 1-3 distinct reasons per row: random ranks over the pool, first k of each row.
+    # With profiles, the history-backed reasons are only given when their signal fires.
+    pool = BANK_REASON_POOL
+    if signals is not None:
+        backed = {name for name, _ in PROFILE_SIGNALS}
+        pool = tuple(r for r in BANK_REASON_POOL if r not in backed)
+    picks = rng.random((n, len(pool))).argsort(axis=1)[:, :3].tolist()
+    counts = rng.integers(1, 4, size=n).tolist()
+    if signals is None:
+        reasons = [[pool[i] for i in row[:k]] for row, k in zip(picks, counts)]
     else:
-        action = "Allow • Monitor"
+        reasons = []
+        for row, k, flags in zip(picks, counts, signals.tolist()):
+            fixed = [name for (name, _), flag in zip(PROFILE_SIGNALS, flags) if flag]
+            reasons.append((fixed + [pool[i] for i in row])[:max(k, len(fixed))])
 
     return {
-        'account': account, 'payee': payee, 'amount': amount, 'ts': ts,
-        'score': score, 'verdict': verdict, 'reasons': reasons, 'action': action
+        'score': score.tolist(), 'verdict': verdict, 'reasons': reasons,
+        'action': [BANK_ACTIONS[v] for v in verdict],
     }
 
+
+# Reasons backed by payee/account history, with the risk each one adds.
+PROFILE_SIGNALS = (
+    ("High transaction amount", 20),
+    ("Repeated payments detected", 12),
+    ("New/unknown payee", 15),
+)
+
+def _profile_signals(
+    profiles, accounts: List[str], payees: List[str], amount: np.ndarray, ts: pd.DatetimeIndex
+) -> np.ndarray:
+    """
+    Looks up each row's payee and account profile (O(1) each) and returns
+    an (n, 3) 0/1 matrix in PROFILE_SIGNALS order: amount ≥ 3σ above the
+    account mean, payee paid within the last hour at least 3 times before,
+    and payee never seen.
+    """
+    n = len(payees)
+    acc_mean, acc_std = np.full(n, np.nan), np.full(n, np.nan)
+    payee_count, payee_last = np.zeros(n), np.full(n, np.nan)
+    for i, (acc, pay) in enumerate(zip(accounts, payees)):
+        a = profiles.get('account', acc)
+        if a is not None and a.count >= 5:
+            acc_mean[i], acc_std[i] = a.mean, a.std
+        p = profiles.get('payee', pay)
+        if p is not None:
+            payee_count[i], payee_last[i] = p.count, p.last_ts
+
+    seconds = (ts - pd.Timestamp(0)).total_seconds().to_numpy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        high_amount = (acc_std > 0) & ((amount - acc_mean) / acc_std >= 3)
+        since_last = seconds - payee_last
+        repeated = (payee_count >= 3) & (since_last >= 0) & (since_last < 3600)
+    new_payee = payee_count == 0
+    return np.column_stack([high_amount, repeated, new_payee]).astype(np.int64)
+
+
+def score_bank_rows(rows: List[Dict[str, Any]], profiles=None) -> List[Dict[str, Any]]:
+    """
+    Batch version of analyze_bank_transaction_row: normalises the account,
+    payee, amount and ts columns of raw row dicts (ts as naive UTC, see
+    parse_bank_timestamps) and scores them column-wise in one pass. When a
+    ProfileStore is given, payee/account history adds risk and the matching
+    reasons (see _profile_signals). Returns documents in the stored
+    BankTransaction shape (ts and createdAt as naive UTC datetimes), so they
+    can be written without building a model per row.
+    """
+    if not rows:
+        return []
+    account = [str(r.get('account', '')).strip() for r in rows]
+    payee = [str(r.get('payee', '')).strip().lower() for r in rows]
+    amount = pd.to_numeric(pd.Series([r.get('amount') for r in rows], dtype=object), errors='coerce')
+    amount = amount.fillna(0.0).to_numpy(dtype=float)
+    parsed = parse_bank_timestamps([r.get('ts') for r in rows])
+
+    scored = _score_bank_columns(account, payee, amount, parsed, np.random.default_rng(), profiles)
+    now = datetime.utcnow()
+    ts = [now if t is pd.NaT else t for t in parsed.to_pydatetime().tolist()]
+    return [
+        {'account': a, 'payee': p, 'amount': m, 'score': sc, 'verdict': v, 'reasons': r, 'action': ac,
+         'ts': t, 'createdAt': now}
+        for a, p, m, sc, v, r, ac, t in zip(
+            account, payee, amount.tolist(), scored['score'], scored['verdict'], scored['reasons'],
+            scored['action'], ts
+        )
+    ]
+
 # --- Logic from common/chatbot.php ---
 def analyze_chatbot_request(
     text: str, upi: str, amount: float, relationship: str, history_count: int
@@ -64,11 +199,10 @@ def analyze_chatbot_request(
     reasons, risk = [], 0
     t, u = text.lower(), upi.lower()
 
-    if any(w in t for w in ['immediately', 'urgent', 'right now', 'final notice', 'asap']):
-        risk += 14; reasons.append("Urgency language detected")
-    if any(w in t for w in ['penalty', 'fine', 'blocked', 'legal action', 'police']):
-        risk += 16; reasons.append("Threatening consequence detected")
-    if u and not re.match(r'^[a-z0-9._-]{2,}@[a-z]{2,}$', u):
+    rules = chatbot_rules.current()
+    for category in rules.match(t):
+        risk += category.risk; reasons.append(category.reason)
+    if u and not rules.upi_re.match(u):
         risk += 8; reasons.append("UPI format looks unusual")
     if amount >= 20000:
         risk += 16; reasons.append("High amount (≥ ₹20k)")
@@ -95,6 +229,18 @@ def analyze_chatbot_request(
     return {'trust': trust, 'verdict': verdict, 'reasons': reasons, 'action': action_map[verdict], 'hash': hash_val}
 
 # --- Logic from common/microfraud.php ---
+def parse_microfraud_text(transactions_text: str) -> List[Dict]:
+    """Parses pasted `date, payee, amount` lines, skipping malformed ones."""
+    transactions = []
+    for line in transactions_text.strip().split('\n'):
+        try:
+            parts = [p.strip() for p in line.split(',')]
+            if len(parts) >= 3:
+                transactions.append({'date': parts[0], 'payee': parts[1], 'amount': float(parts[2])})
+        except (ValueError, IndexError):
+            continue
+    return transactions
+
 def analyze_microfraud_transactions(transactions: List[Dict]) -> List[Dict]:
     """Analyzes a list of transactions for micro-fraud patterns."""
     grouped = {}
@@ -108,63 +254,223 @@ def analyze_microfraud_transactions(transactions: List[Dict]) -> List[Dict]:
     
     results = []
     for p, g in grouped.items():
-        reasons, risk = [], 0
-        avg = g['total'] / max(1, g['count'])
-        if avg <= 300 and g['count'] >= 3:
-            risk += 18; reasons.append(f"Repeated small payments ({g['count']})")
-        if g['count'] >= 5 and g['total'] >= 2000:
-            risk += 16; reasons.append(f"High total (₹{g['total']:.2f}) across small payments")
-        
-        heur_trust = max(0, min(100, 100 - risk))
-        
-        hash_input = f"{p}|{g['total']}|{g['count']}"
-        hash_val = hashlib.md5(hash_input.encode()).hexdigest()
-        bucket = int(hash_val[:2], 16) % 3
-        target_trust = {0: random.randint(85, 95), 1: random.randint(55, 65), 2: random.randint(15, 30)}[bucket]
-        trust = int(0.6 * heur_trust + 0.4 * target_trust)
-        verdict = 'SAFE' if trust >= 75 else 'SUSPICIOUS' if trust >= 50 else 'FRAUD'
-        
+        reasons, risk = _microfraud_rules(g['total'], g['count'])
+        trust, verdict = _microfraud_trust(f"{p}|{g['total']}|{g['count']}", risk)
         results.append({
             'payee': g['payee'], 'count': g['count'], 'total': g['total'],
             'trust': trust, 'verdict': verdict, 'reasons': reasons
         })
     return results
 
+def _microfraud_rules(total: float, count: int) -> Tuple[List[str], int]:
+    reasons, risk = [], 0
+    avg = total / max(1, count)
+    if avg <= 300 and count >= 3:
+        risk += 18; reasons.append(f"Repeated small payments ({count})")
+    if count >= 5 and total >= 2000:
+        risk += 16; reasons.append(f"High total (₹{total:.2f}) across small payments")
+    return reasons, risk
+
+def _microfraud_trust(hash_input: str, risk: int) -> Tuple[int, str]:
+    heur_trust = max(0, min(100, 100 - risk))
+    hash_val = hashlib.md5(hash_input.encode()).hexdigest()
+    bucket = int(hash_val[:2], 16) % 3
+    target_trust = {0: random.randint(85, 95), 1: random.randint(55, 65), 2: random.randint(15, 30)}[bucket]
+    trust = int(0.6 * heur_trust + 0.4 * target_trust)
+    verdict = 'SAFE' if trust >= 75 else 'SUSPICIOUS' if trust >= 50 else 'FRAUD'
+    return trust, verdict
+
+def analyze_velocity_windows(groups: List[Dict]) -> List[Dict]:
+    """
+    Scores stored per-payee/per-account velocity windows (see
+    services/velocity.py). The micro-fraud rules run on the widest window,
+    and bursts inside the shorter windows add extra risk.
+    """
+    results = []
+    for g in groups:
+        windows = g['windows']
+        widest = windows[list(windows)[-1]]
+        reasons, risk = _microfraud_rules(widest['total'], widest['count'])
+        if windows.get('1h', {}).get('count', 0) >= 5:
+            risk += 12; reasons.append(f"Burst of {windows['1h']['count']} payments within 1h")
+        elif windows.get('24h', {}).get('count', 0) >= 10:
+            risk += 8; reasons.append(f"{windows['24h']['count']} payments within 24h")
+        trust, verdict = _microfraud_trust(f"{str(g['key']).lower()}|{widest['total']}|{widest['count']}", risk)
+        results.append({**g, 'trust': trust, 'verdict': verdict, 'reasons': reasons})
+    return results
+
 # --- Logic from common/screenshot.php ---
-def get_ela_score(image_bytes: bytes) -> float:
+ImageInput = Union[bytes, Image.Image]
+
+# QR decoding runs on a working copy bounded by the caller's max_side
+# (settings.IMAGE_WORKING_MAX_SIDE). ELA always runs at native resolution,
+# because its score depends on scale and ELA_THRESHOLD was calibrated on
+# native images, so peak memory follows the pixel count (see
+# IMAGE_MAX_PIXELS); it re-encodes in tiles of ELA_TILE (a multiple of the
+# 16px JPEG MCU, so tiling does not shift block boundaries).
+ELA_TILE = 512
+ELA_THRESHOLD = 2.0
+
+# QR decoding tries the cheapest scale first: the long side in pixels per
+# pass, None meaning the working resolution itself.
+QR_PASSES: Tuple[Optional[int], ...] = (480, 1024, None)
+_qr_detector = None
+
+def image_dimensions(image_bytes: bytes) -> Optional[Tuple[int, int]]:
+    """Reads width and height from the image header without decoding pixels."""
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            return img.size
+    except Exception: return None
+
+def decode_image(image_bytes: bytes, max_pixels: Optional[int] = None) -> Optional[Image.Image]:
+    """
+    Decodes an upload once at native resolution so ELA, EXIF and the QR
+    working copy share the same image. Images over `max_pixels` are refused
+    before their pixels are decoded.
+    """
+    try:
+        img = Image.open(io.BytesIO(image_bytes))
+        if max_pixels and img.width * img.height > max_pixels:
+            return None
+        img.load()
+        return img
+    except Exception: return None
+
+def working_copy(image: Image.Image, max_side: Optional[int]) -> Image.Image:
+    """Box-reduces `image` until its long side is at most `max_side`."""
+    factor = -(-max(image.size) // max_side) if max_side else 1
+    if factor <= 1:
+        return image
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    return image.reduce(factor)
+
+def get_ela_score(image: ImageInput, tile: int = ELA_TILE) -> float:
+    """
+    Mean absolute difference between the image and a quality-85 re-encode,
+    computed tile by tile so only one tile's re-encode is in memory at once.
+    """
     try:
-        original = Image.open(io.BytesIO(image_bytes)).convert('RGB')
-        resaved_buffer = io.BytesIO()
-        original.save(resaved_buffer, 'JPEG', quality=85)
-        resaved = Image.open(resaved_buffer)
-        diff_sum = sum(abs(p1 - p2) for p1, p2 in zip(original.tobytes(), resaved.tobytes()))
-        pixels = original.width * original.height * 3
+        if isinstance(image, bytes):
+            image = decode_image(image)
+        original = image if image.mode == 'RGB' else image.convert('RGB')
+        width, height = original.size
+        diff_sum = 0
+        for top in range(0, height, tile):
+            for left in range(0, width, tile):
+                part = original.crop((left, top, min(left + tile, width), min(top + tile, height)))
+                resaved_buffer = io.BytesIO()
+                part.save(resaved_buffer, 'JPEG', quality=85)
+                resaved = Image.open(resaved_buffer).convert('RGB')
+                diff = np.subtract(np.asarray(part), np.asarray(resaved), dtype=np.int16)
+                diff_sum += int(np.abs(diff, out=diff).sum(dtype=np.int64))
+        pixels = width * height * 3
         return min(100.0, (diff_sum / pixels) * 10) if pixels > 0 else 0.0
     except Exception: return 0.0
 
-def get_exif_software(image_bytes: bytes) -> str:
+def decode_qr(image: Image.Image, passes: Tuple[Optional[int], ...] = QR_PASSES) -> Tuple[str, Optional[int]]:
+    """
+    Looks for a QR code in grayscale copies of `image`, downscaled with
+    INTER_AREA per pass and stopping at the first pass that decodes one.
+    The first pass only runs detection, on the copy and on its inverse (for
+    light-on-dark, dark mode codes): decoding and the larger passes run only
+    for a polarity where it found a candidate, so images without a code
+    cost one cheap detection pair. Returns the payload and the index of the
+    pass that decoded it, or ('', None).
+    """
+    global _qr_detector
+    if cv2 is None:
+        return '', None
+    if _qr_detector is None:
+        _qr_detector = cv2.QRCodeDetector()
+    gray = np.asarray(image.convert('L'))
+    height, width = gray.shape
+    polarities = (True, False) if gray.mean() < 128 else (False, True)
+    candidates = None
+    for index, side in enumerate(passes):
+        scale = side / max(height, width) if side else 1.0
+        if scale < 1.0:
+            scaled = cv2.resize(gray, (max(1, round(width * scale)), max(1, round(height * scale))),
+                                interpolation=cv2.INTER_AREA)
+        else:
+            scaled = gray
+        copies = {invert: cv2.bitwise_not(scaled) if invert else scaled for invert in (candidates or polarities)}
+        try:
+            if candidates is None:
+                found = [(invert, _qr_detector.detect(copies[invert])) for invert in polarities]
+                candidates = [invert for invert, (ok, _) in found if ok]
+                if not candidates:
+                    return '', None
+                texts = (_qr_detector.decode(copies[invert], points)[0] for invert, (ok, points) in found if ok)
+            else:
+                texts = (_qr_detector.detectAndDecode(copies[invert])[0] for invert in candidates)
+            text = next((t for t in texts if t), '')
+        except cv2.error:
+            text = ''
+        if text:
+            return text, index
+        if scale >= 1.0:
+            break  # later passes would not add any detail
+    return '', None
+
+def get_exif_software(image: ImageInput) -> str:
     try:
-        img = Image.open(io.BytesIO(image_bytes))
-        exif = {ExifTags.TAGS[k]: v for k, v in img._getexif().items() if k in ExifTags.TAGS}
-        return str(exif.get('Software', ''))
+        if isinstance(image, bytes):
+            image = decode_image(image)
+        return str(image.getexif().get(ExifTags.Base.Software, ''))
     except Exception: return ''
 
-def analyze_image_heuristics(image_bytes: bytes, qr_text: str = "") -> Dict[str, Any]:
+def analyze_image_heuristics(
+    image_bytes: bytes, qr_text: str = "", timings: Optional[Dict[str, float]] = None,
+    max_side: Optional[int] = None, max_pixels: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Scores an uploaded image. ELA and EXIF use the native-resolution decode
+    (refused over `max_pixels`); QR decoding uses a working copy of at most
+    `max_side` pixels on its long side (None = native). A QR code found in
+    the image takes precedence over the client-supplied `qr_text` and is returned as
+    `qr_text`. If `timings` is given, the seconds spent in decode, ela,
+    exif and qr are stored in it.
+    """
+    timings = {} if timings is None else timings
     reasons, risk = [], 0
-    if get_ela_score(image_bytes) > 2.0:
+    start = time.perf_counter()
+    image = decode_image(image_bytes, max_pixels=max_pixels)
+    timings['decode'] = time.perf_counter() - start
+    start = time.perf_counter()
+    if image is not None and get_ela_score(image) > ELA_THRESHOLD:
         risk += 30; reasons.append("High compression anomaly (ELA)")
-    software = get_exif_software(image_bytes).lower()
+    timings['ela'] = time.perf_counter() - start
+    start = time.perf_counter()
+    software = get_exif_software(image).lower() if image is not None else ''
+    timings['exif'] = time.perf_counter() - start
+    start = time.perf_counter()
+    decoded_qr = decode_qr(working_copy(image, max_side))[0] if image is not None else ''
+    timings['qr'] = time.perf_counter() - start
+    qr_text = decoded_qr or qr_text or ''
     if any(e in software for e in ['photoshop', 'gimp', 'canva']):
         risk += 22; reasons.append(f"Edited using {software}")
     if qr_text and "bit.ly" in qr_text.lower():
         risk += 15; reasons.append("Shortened URL in QR content")
     
-    risk = max(0, min(100, risk + random.randint(-3, 3)))
-    heur_trust = 100 - risk
+    # Jitter and target trust are derived from the content hash rather than
+    # random draws, so the same image always gets the same verdict (and can be cached).
     hash_val = hashlib.md5(image_bytes).hexdigest()
+    risk = max(0, min(100, risk + int(hash_val[2:4], 16) % 7 - 3))
+    heur_trust = 100 - risk
     bucket = int(hash_val[:2], 16) % 3
-    target_trust = {0: random.randint(85, 95), 1: random.randint(55, 65), 2: random.randint(15, 30)}[bucket]
+    spread = int(hash_val[4:6], 16)
+    target_trust = {0: 85 + spread % 11, 1: 55 + spread % 11, 2: 15 + spread % 16}[bucket]
     trust = int(0.55 * heur_trust + 0.45 * target_trust)
     verdict = 'SAFE' if trust >= 75 else 'SUSPICIOUS' if trust >= 50 else 'FRAUD'
     
-    return {'trust': trust, 'verdict': verdict, 'reasons': list(set(reasons))}
+    return {'trust': trust, 'verdict': verdict, 'reasons': list(set(reasons)), 'qr_text': qr_text}
+
+def analyze_image_with_timings(
+    image_bytes: bytes, qr_text: str = "",
+    max_side: Optional[int] = None, max_pixels: Optional[int] = None
+) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """Runs analyze_image_heuristics and returns its stage timings too (for process pools)."""
+    timings: Dict[str, float] = {}
+    return analyze_image_heuristics(image_bytes, qr_text, timings, max_side, max_pixels), timings
@@ -0,0 +1,247 @@
+import asyncio
+import gzip
+import os
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+from bson import json_util
+from pymongo.errors import BulkWriteError, PyMongoError
+
+ARCHIVED_COLLECTIONS = ('bank_transactions', 'common_analyses')
+# Extended JSON keeps ObjectIds and datetimes (as naive UTC, like the rest of the app) round-tripping
+ARCHIVE_JSON = json_util.JSONOptions(json_mode=json_util.JSONMode.RELAXED, tz_aware=False)
+
+
+def _partition_dir(root: str, collection: str, day: str) -> str:
+    return os.path.join(root, collection, day)
+
+
+def write_partitions(root: str, collection: str, docs: List[Dict]) -> int:
+    """
+    Writes documents as gzip NDJSON under root/collection/YYYY-MM-DD/, one
+    new part file per day, by `createdAt`. Files are fsynced and renamed
+    into place before returning, so callers may delete the originals.
+    """
+    by_day: Dict[str, List[Dict]] = defaultdict(list)
+    for doc in docs:
+        by_day[doc['createdAt'].strftime('%Y-%m-%d')].append(doc)
+
+    written = 0
+    for day, day_docs in by_day.items():
+        directory = _partition_dir(root, collection, day)
+        os.makedirs(directory, exist_ok=True)
+        name = f"part-{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}.ndjson.gz"
+        tmp = os.path.join(directory, f".{name}.tmp")
+        with open(tmp, 'wb') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb') as f:
+                for doc in day_docs:
+                    f.write(json_util.dumps(doc, json_options=ARCHIVE_JSON).encode('utf-8'))
+                    f.write(b'\n')
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp, os.path.join(directory, name))
+        written += len(day_docs)
+    return written
+
+
+def list_partitions(root: str, collection: str) -> List[Dict]:
+    """
+    Archived days of a collection with their file count and size, oldest first.
+    """
+    base = os.path.join(root, collection)
+    if not os.path.isdir(base):
+        return []
+    partitions = []
+    for day in sorted(os.listdir(base)):
+        files = [f for f in os.listdir(os.path.join(base, day)) if f.endswith('.ndjson.gz')]
+        if files:
+            size = sum(os.path.getsize(os.path.join(base, day, f)) for f in files)
+            partitions.append({'day': day, 'files': len(files), 'bytes': size})
+    return partitions
+
+
+def iter_archive(
+    root: str, collection: str, from_day: str, to_day: str, filters: Optional[Dict] = None
+) -> Iterator[Dict]:
+    """
+    Reads archived documents of the days from_day..to_day (inclusive,
+    YYYY-MM-DD), keeping those whose fields equal every value in `filters`.
+    """
+    filters = filters or {}
+    for partition in list_partitions(root, collection):
+        if not from_day <= partition['day'] <= to_day:
+            continue
+        directory = _partition_dir(root, collection, partition['day'])
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith('.ndjson.gz'):
+                continue
+            with gzip.open(os.path.join(directory, name), 'rt', encoding='utf-8') as f:
+                for line in f:
+                    doc = json_util.loads(line, json_options=ARCHIVE_JSON)
+                    if all(doc.get(k) == v for k, v in filters.items()):
+                        yield doc
+
+
+async def restore_range(
+    db, root: str, collection: str, from_day: str, to_day: str,
+    filters: Optional[Dict] = None, batch_size: int = 1000
+) -> Tuple[int, int]:
+    """
+    Re-imports an archived range into its collection. Documents keep their
+    _id, so ones already present are skipped, and are marked `restoredAt`:
+    the sweep does not archive them again (they are still in the archive).
+    Returns (read, inserted).
+    """
+    docs = iter_archive(root, collection, from_day, to_day, filters)
+    read = inserted = 0
+    while True:
+        batch = await asyncio.to_thread(lambda: [doc for _, doc in zip(range(batch_size), docs)])
+        if not batch:
+            return read, inserted
+        read += len(batch)
+        restored_at = datetime.utcnow()
+        for doc in batch:
+            doc['restoredAt'] = restored_at
+        try:
+            result = await db[collection].insert_many(batch, ordered=False)
+            inserted += len(result.inserted_ids)
+        except BulkWriteError as e:
+            inserted += e.details.get('nInserted', 0)
+
+
+class RetentionSweeper:
+    """
+    Periodically moves documents past their retention period out of
+    `bank_transactions` and `common_analyses`: each batch is written to the
+    disk archive first and only then deleted from Mongo. The dashboard
+    rollups are left untouched, so their counts still cover archived rows.
+    Restored documents (see restore_range) are never archived twice; after
+    `restored_days` they are deleted again (0 keeps them).
+    """
+    def __init__(self):
+        self.db = None
+        self.archive_dir = "data/archive"
+        self.retention_days: Dict[str, int] = {}
+        self.feature_days: Dict[str, int] = {}
+        self.restored_days = 0
+        self.batch_size = 5000
+        self.interval = 3600.0
+        self._task: asyncio.Task = None
+        self.sweeps = 0
+        self.archived: Dict[str, int] = defaultdict(int)
+        self.expired_restores: Dict[str, int] = defaultdict(int)
+        self.last_sweep_ms = 0.0
+
+    def configure(self, db, archive_dir: str, retention_days: Dict[str, int],
+                  feature_days: Dict[str, int], batch_size: int, interval: float, restored_days: int = 0):
+        self.db = db
+        self.archive_dir = archive_dir
+        self.retention_days = retention_days
+        self.feature_days = feature_days
+        self.batch_size = batch_size
+        self.interval = interval
+        self.restored_days = restored_days
+
+    def start(self, *args):
+        """
+        Configures the sweeper and starts the periodic sweep, unless no
+        retention period is set.
+        """
+        self.configure(*args)
+        if self.rules(datetime.utcnow()) or self.restored_days > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def rules(self, now: datetime) -> List[Tuple[str, Dict]]:
+        """
+        (collection, query) pairs selecting expired documents that have not
+        been restored from the archive. Per-feature periods override the
+        common_analyses default; 0 keeps forever.
+        """
+        live = {'restoredAt': {'$exists': False}}
+        rules = []
+        for collection in ARCHIVED_COLLECTIONS:
+            days = self.retention_days.get(collection, 0)
+            if collection == 'common_analyses':
+                for feature, feature_days in self.feature_days.items():
+                    if feature_days > 0:
+                        rules.append((collection, {
+                            'feature': feature, 'createdAt': {'$lt': now - timedelta(days=feature_days)}, **live
+                        }))
+                if days > 0:
+                    query = {'createdAt': {'$lt': now - timedelta(days=days)}, **live}
+                    if self.feature_days:
+                        query['feature'] = {'$nin': list(self.feature_days)}
+                    rules.append((collection, query))
+            elif days > 0:
+                rules.append((collection, {'createdAt': {'$lt': now - timedelta(days=days)}, **live}))
+        return rules
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sweep()
+            except PyMongoError as e:
+                print(f"Retention sweep failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def sweep(self) -> Dict[str, int]:
+        """
+        Archives and deletes every expired document, batch by batch.
+        """
+        start = time.perf_counter()
+        moved: Dict[str, int] = defaultdict(int)
+        for collection, query in self.rules(datetime.utcnow()):
+            while True:
+                batch = await (
+                    self.db[collection].find(query).sort('createdAt', 1).limit(self.batch_size)
+                    .to_list(length=self.batch_size)
+                )
+                if not batch:
+                    break
+                await asyncio.to_thread(write_partitions, self.archive_dir, collection, batch)
+                await self.db[collection].delete_many({'_id': {'$in': [d['_id'] for d in batch]}})
+                moved[collection] += len(batch)
+                self.archived[collection] += len(batch)
+                if len(batch) < self.batch_size:
+                    break
+        if self.restored_days > 0:
+            # Restored copies are already archived, so they are only deleted
+            cutoff = datetime.utcnow() - timedelta(days=self.restored_days)
+            for collection in ARCHIVED_COLLECTIONS:
+                result = await self.db[collection].delete_many({'restoredAt': {'$lt': cutoff}})
+                if result.deleted_count:
+                    self.expired_restores[collection] += result.deleted_count
+                    print(f"Retention sweep removed {result.deleted_count} restored {collection} documents.")
+        self.sweeps += 1
+        self.last_sweep_ms = (time.perf_counter() - start) * 1000
+        if moved:
+            print(f"Retention sweep archived {dict(moved)} in {self.last_sweep_ms:.0f} ms.")
+        return dict(moved)
+
+    def stats(self) -> Dict:
+        return {
+            "sweeps": self.sweeps,
+            "archived": dict(self.archived),
+            "expired_restores": dict(self.expired_restores),
+            "last_sweep_ms": round(self.last_sweep_ms, 3),
+            "rules": len(self.rules(datetime.utcnow())),
+        }
+
+retention_sweeper = RetentionSweeper()
+
+def get_retention_sweeper() -> RetentionSweeper:
+    """
+    Returns the retention sweeper.
+    """
+    return retention_sweeper
@@ -0,0 +1,302 @@
+import asyncio
+import csv
+import hashlib
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException, UploadFile
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+
+from ..core.metrics import rows_processed, stage
+from .csv_handler import ANALYSIS_COLUMNS, analyze_bank_rows, filter_new_rows, store_bank_batch
+from .profiles import UploadProfiles, profile_store
+
+
+def read_csv_chunk(path: str, offset: int, max_rows: int) -> Tuple[List[List[str]], int]:
+    """
+    Reads up to `max_rows` CSV records from `path` starting at byte `offset`,
+    keeping quoted fields that span lines together. Returns the rows and the
+    byte offset of the next record; an empty list means the end of the file.
+    """
+    records = []
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        record, in_quotes = b'', False
+        while len(records) < max_rows:
+            line = f.readline()
+            if not line:
+                if record:
+                    records.append(record)
+                break
+            record += line
+            if line.count(b'"') % 2:
+                in_quotes = not in_quotes
+            if not in_quotes:
+                records.append(record)
+                record = b''
+        next_offset = f.tell()
+
+    text = [r.decode('utf-8-sig' if offset == 0 and i == 0 else 'utf-8', errors='replace')
+            for i, r in enumerate(records)]
+    return [row for row in csv.reader(text) if row], next_offset
+
+
+class LeaseLost(Exception):
+    """Another worker took over a job whose lease this worker let expire."""
+
+
+class BankJobRunner:
+    """
+    Runs large bank CSV analyses in the background. Uploads are spooled to
+    disk and tracked in `bank_jobs`; a fixed number of worker tasks claim
+    jobs and process them chunk by chunk, committing the byte offset after
+    each chunk so an interrupted job resumes where it stopped.
+
+    Every uvicorn worker process runs its own runner against the same
+    collection, so a job is claimed atomically (queued, or running with an
+    expired lease) and its lease is renewed while it is processed. Only a
+    job whose owner stopped renewing is taken over.
+    """
+    def __init__(self):
+        self.db = None
+        self.directory = "data/jobs"
+        self.chunk_rows = 5000
+        self.lease_seconds = 60.0
+        self.poll_seconds = 5.0
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue: asyncio.Queue = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self, db, directory: str, workers: int, chunk_rows: int,
+                    lease_seconds: float = 60.0, poll_seconds: float = 5.0):
+        self.db = db
+        self.directory = directory
+        self.chunk_rows = chunk_rows
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self._queue = asyncio.Queue()
+        os.makedirs(directory, exist_ok=True)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(max(1, workers))]
+
+    async def stop(self):
+        """
+        Cancels the workers and hands their jobs back to the queue, so
+        another process resumes them from the last committed chunk without
+        waiting for the lease to expire.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.db is not None:
+            await self.db["bank_jobs"].update_many(
+                {'owner': self.owner, 'status': 'running'},
+                {'$set': {'status': 'queued', 'owner': None, 'lease_until': None}}
+            )
+
+    async def submit(self, file: UploadFile, chunk_size: int) -> Dict:
+        """
+        Spools an upload to disk, records the job and wakes a worker. A file
+        identical to an earlier job that has not failed returns that job.
+        """
+        if not file.filename.endswith('.csv'):
+            raise HTTPException(status_code=400, detail="Invalid file type. Please upload a CSV.")
+
+        job_id = uuid.uuid4().hex
+        path = os.path.join(self.directory, f"{job_id}.csv")
+        size = 0
+        digest = hashlib.sha256()
+        with open(path, 'wb') as f:
+            while chunk := await file.read(chunk_size):
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+
+        previous = await self.db["bank_jobs"].find_one({'sha256': digest.hexdigest(), 'status': {'$ne': 'failed'}})
+        if previous is not None:
+            os.remove(path)
+            return previous
+
+        now = datetime.utcnow()
+        job = {
+            '_id': job_id, 'filename': file.filename, 'path': path, 'sha256': digest.hexdigest(),
+            'status': 'queued', 'owner': None, 'lease_until': None,
+            'headers': None, 'has_analysis': False, 'offset': 0, 'bytes_total': size,
+            'next_row': 0, 'rows': 0, 'inserted': 0, 'duplicates': 0, 'verdicts': {}, 'elapsed': 0.0,
+            'error': None, 'createdAt': now, 'updatedAt': now, 'finishedAt': None,
+        }
+        await self.db["bank_jobs"].insert_one(job)
+        self._queue.put_nowait(job_id)
+        return job
+
+    async def claim(self) -> Optional[Dict]:
+        """
+        Atomically takes the oldest job that is queued or whose lease has
+        expired (or, for jobs from before leases, was never set), and leases
+        it to this runner. Returns the claimed job or None.
+        """
+        now = datetime.utcnow()
+        return await self.db["bank_jobs"].find_one_and_update(
+            {'$or': [
+                {'status': 'queued'},
+                {'status': 'running', 'lease_until': {'$lt': now}},
+                {'status': 'running', 'lease_until': None},
+            ]},
+            {'$set': {
+                'status': 'running', 'owner': self.owner,
+                'lease_until': now + timedelta(seconds=self.lease_seconds), 'updatedAt': now,
+            }},
+            sort=[('createdAt', 1)], return_document=ReturnDocument.AFTER,
+        )
+
+    async def _renew(self, job_id: str) -> bool:
+        result = await self.db["bank_jobs"].update_one(
+            {'_id': job_id, 'owner': self.owner, 'status': 'running'},
+            {'$set': {'lease_until': datetime.utcnow() + timedelta(seconds=self.lease_seconds)}}
+        )
+        return result.matched_count == 1
+
+    async def _heartbeat(self, job_id: str, lost: asyncio.Event):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                if not await self._renew(job_id):
+                    lost.set()
+                    return
+            except PyMongoError as e:
+                print(f"Bank job {job_id}: lease renewal failed: {e}")
+
+    async def _worker(self):
+        while True:
+            job = await self.claim()
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._queue.get(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            job_id = job['_id']
+            lost = asyncio.Event()
+            heartbeat = asyncio.create_task(self._heartbeat(job_id, lost))
+            try:
+                await self._process(job, lost)
+            except asyncio.CancelledError:
+                raise
+            except LeaseLost:
+                print(f"Bank job {job_id}: lease lost, leaving it to its new owner.")
+            except Exception as e:
+                detail = e.detail if isinstance(e, HTTPException) else str(e)
+                print(f"Bank job {job_id} failed: {detail}")
+                await self.db["bank_jobs"].update_one({'_id': job_id, 'owner': self.owner}, {'$set': {
+                    'status': 'failed', 'error': detail, 'finishedAt': datetime.utcnow(),
+                }})
+            finally:
+                heartbeat.cancel()
+
+    async def _commit(self, job_id: str, update: Dict):
+        """
+        Applies a progress update only while this runner still owns the job,
+        extending the lease with it.
+        """
+        update.setdefault('$set', {})['lease_until'] = datetime.utcnow() + timedelta(seconds=self.lease_seconds)
+        result = await self.db["bank_jobs"].update_one({'_id': job_id, 'owner': self.owner}, update)
+        if result.matched_count != 1:
+            raise LeaseLost(job_id)
+
+    async def _stored_by_job(self, job_id: str, first_row: int, count: int) -> Dict[int, str]:
+        """
+        Rows of `job_id` numbered first_row..first_row+count-1 that are
+        already stored, with their verdicts: a chunk that was written but not
+        committed before the job's previous owner stopped.
+        """
+        cursor = self.db["bank_transactions"].find(
+            {'job_id': job_id, 'row': {'$gte': first_row, '$lt': first_row + count}},
+            {'_id': 0, 'row': 1, 'verdict': 1}
+        )
+        return {doc['row']: doc['verdict'] async for doc in cursor}
+
+    async def _process(self, job: Dict, lost: asyncio.Event):
+        job_id = job['_id']
+        headers, has_analysis = job['headers'], job['has_analysis']
+        offset, next_row = job['offset'], job['next_row']
+        profiles = UploadProfiles(profile_store)
+        while True:
+            if lost.is_set():
+                raise LeaseLost(job_id)
+            started = time.perf_counter()
+            with stage('job', 'read'):
+                rows, new_offset = await asyncio.to_thread(read_csv_chunk, job['path'], offset, self.chunk_rows)
+            if not rows:
+                break
+
+            if headers is None:
+                headers = [h.lower().strip() for h in rows.pop(0)]
+                has_analysis = all(k in headers for k in ANALYSIS_COLUMNS)
+            batch = [dict(zip(headers, row)) for row in rows]
+
+            update = {'$set': {
+                'offset': new_offset, 'headers': headers, 'has_analysis': has_analysis,
+                'next_row': next_row + len(batch), 'updatedAt': datetime.utcnow(),
+            }}
+            if batch:
+                rows_processed.inc('job', amount=len(batch))
+                with stage('job', 'dedupe'):
+                    keep, fingerprints = await filter_new_rows(self.db, batch)
+                    # Rows this job stored in a chunk its previous owner did not
+                    # commit are its own results, not duplicates.
+                    own = await self._stored_by_job(job_id, next_row, len(batch)) if len(keep) < len(batch) else {}
+                with stage('job', 'score'):
+                    results = await asyncio.to_thread(analyze_bank_rows, [batch[i] for i in keep], has_analysis, profiles)
+                    profiles.observe_rows(results)
+                for result, fp in zip(results, fingerprints):
+                    result['fingerprint'] = fp
+                inserted, verdicts = await store_bank_batch(
+                    self.db, results, job_id=job_id, rows=[next_row + i for i in keep]
+                )
+                for verdict in own.values():
+                    verdicts[verdict] = verdicts.get(verdict, 0) + 1
+                inserted += len(own)
+                update['$inc'] = {
+                    'rows': len(batch), 'inserted': inserted, 'duplicates': len(batch) - inserted,
+                    'elapsed': time.perf_counter() - started,
+                    **{f'verdicts.{v}': n for v, n in verdicts.items()},
+                }
+            await self._commit(job_id, update)
+            offset, next_row = new_offset, next_row + len(batch)
+
+        if headers is None:
+            raise HTTPException(status_code=400, detail="CSV file is empty.")
+        await self._commit(job_id, {'$set': {'status': 'done', 'finishedAt': datetime.utcnow()}})
+        try:
+            os.remove(job['path'])
+        except OSError:
+            pass
+
+    async def get(self, job_id: str) -> Optional[Dict]:
+        """
+        Returns a job's progress, shaped for the BankJob model.
+        """
+        job = await self.db["bank_jobs"].find_one({'_id': job_id})
+        if job is None:
+            return None
+        return {
+            'id': job['_id'], 'filename': job['filename'], 'status': job['status'],
+            'rows': job['rows'], 'inserted': job['inserted'], 'duplicates': job.get('duplicates', 0),
+            'verdicts': job['verdicts'],
+            'bytes_done': job['offset'], 'bytes_total': job['bytes_total'],
+            'rows_per_second': round(job['rows'] / job['elapsed'], 1) if job['elapsed'] else 0.0,
+            'error': job['error'], 'createdAt': job['createdAt'], 'finishedAt': job['finishedAt'],
+        }
+
+bank_jobs = BankJobRunner()
+
+def get_bank_jobs() -> BankJobRunner:
+    """
+    Returns the background bank CSV job runner.
+    """
+    return bank_jobs
@@ -1,59 +1,258 @@
 # File: server/app/services/csv_handler.py
 
+import codecs
 import csv
-import io
+import hashlib
+from collections import Counter
 from fastapi import UploadFile, HTTPException
-from typing import List, Dict
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from datetime import datetime
 
-from .analysis import analyze_bank_transaction_row
+from ..core.metrics import rows_processed, stage
+from ..models.bank import BankTransaction
+from .analysis import score_bank_rows
+from .profiles import UploadProfiles, profile_store
+from .rollups import apply_rollups
 
-async def process_bank_csv(file: UploadFile) -> List[Dict]:
+ANALYSIS_COLUMNS = ('score', 'verdict', 'reasons', 'action')
+
+
+async def iter_csv_rows(file: UploadFile, chunk_size: int) -> AsyncIterator[List[List[str]]]:
+    """
+    Reads an uploaded CSV in chunks of `chunk_size` bytes and yields the rows
+    parsed from each chunk. Only the current chunk and one partial record are
+    held in memory, and quoted fields spanning lines are kept together.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    tail = ''          # text after the last newline of the previous chunk
+    record = ''        # lines of a record whose quotes are still open
+    in_quotes = False
+
+    while True:
+        with stage('upload', 'read'):
+            chunk = await file.read(chunk_size)
+        with stage('upload', 'parse'):
+            text = tail + decoder.decode(chunk, final=not chunk)
+            lines = text.split('\n')
+            tail = lines.pop() if chunk else ''
+            if not chunk and lines[-1] == '':
+                lines.pop()
+
+            records = []
+            for line in lines:
+                record += line + '\n'
+                if line.count('"') % 2:
+                    in_quotes = not in_quotes
+                if not in_quotes:
+                    records.append(record)
+                    record = ''
+            if not chunk and record:
+                records.append(record)
+            rows = [row for row in csv.reader(records) if row] if records else []
+
+        if rows:
+            yield rows
+        if not chunk:
+            return
+
+
+def parse_analyzed_row(row_dict: Dict[str, str]) -> Dict:
+    """
+    Turns a CSV row that already carries model outputs (score, verdict,
+    reasons, action) into an analysis result, using the values as-is.
+    """
+    verdict = str(row_dict.get('verdict', 'SAFE')).strip().upper()
+    reasons_raw = str(row_dict.get('reasons', '')).strip()
+
+    if '•' in reasons_raw:
+        reasons = [r.strip() for r in reasons_raw.split('•')]
+    else:
+        reasons = [r.strip() for r in reasons_raw.split(',')]
+
+    return {
+        'account': str(row_dict.get('account', '')).strip(),
+        'payee': str(row_dict.get('payee', '')).strip().lower(),
+        'amount': float(row_dict.get('amount', 0)),
+        'ts': str(row_dict.get('ts', '')).strip() or datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+        'score': int(row_dict.get('score', 0)),
+        'verdict': verdict,
+        'reasons': reasons,
+        'action': str(row_dict.get('action', 'Allow • Monitor')).strip()
+    }
+
+
+def parse_ts(value) -> Optional[datetime]:
+    """
+    Parses a CSV timestamp such as '2025-08-25 01:22:00'; unparseable values become None.
+    """
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value).strip().replace(" ", "T"))
+    except ValueError:
+        return None
+
+
+def analyze_bank_rows(rows: List[Dict[str, str]], has_analysis: bool, profiles=profile_store) -> List[Dict]:
+    """
+    Scores raw CSV row dicts against `profiles` (an upload's UploadProfiles,
+    or the shared store), or takes their values as-is when the CSV already
+    carries the analysis columns. Either way the results are documents in
+    the stored BankTransaction shape: the scorer builds them column-wise,
+    and pre-analyzed rows are validated through the model here.
+    """
+    if not has_analysis:
+        return score_bank_rows(rows, profiles)
+    try:
+        return [
+            BankTransaction(**{**r, 'ts': parse_ts(r['ts'])}).model_dump(by_alias=True)
+            for r in map(parse_analyzed_row, rows)
+        ]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Malformed score/amount in CSV: {e}")
+
+
+async def hash_upload(file: UploadFile, chunk_size: int) -> str:
     """
-    Reads a CSV file, processes each row, and returns a list of dictionaries
-    containing the analysis results.
+    Returns the sha256 of an upload's content and rewinds it.
+    """
+    digest = hashlib.sha256()
+    while chunk := await file.read(chunk_size):
+        digest.update(chunk)
+    await file.seek(0)
+    return digest.hexdigest()
+
+
+def row_fingerprint(row: Dict[str, str]) -> str:
+    """
+    Identifies a raw CSV row by its normalised (account, payee, amount, ts),
+    so the same transaction in two overlapping exports gets the same value.
+    """
+    try:
+        amount = repr(float(row.get('amount') or 0))
+    except ValueError:
+        amount = str(row.get('amount')).strip()
+    ts = parse_ts(row.get('ts'))
+    key = '\x1f'.join((
+        str(row.get('account', '')).strip(),
+        str(row.get('payee', '')).strip().lower(),
+        amount,
+        ts.isoformat() if ts else str(row.get('ts', '')).strip(),
+    ))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+async def filter_new_rows(db, rows: List[Dict[str, str]]) -> Tuple[List[int], List[str]]:
+    """
+    Drops rows already stored in `bank_transactions` or repeated earlier in
+    `rows`, with one $in lookup on the fingerprint index. Returns the indexes
+    of the rows to keep and their fingerprints.
+    """
+    fingerprints = [row_fingerprint(r) for r in rows]
+    seen = set()
+    cursor = db["bank_transactions"].find(
+        {'fingerprint': {'$in': list(set(fingerprints))}}, {'_id': 0, 'fingerprint': 1}
+    )
+    async for doc in cursor:
+        seen.add(doc['fingerprint'])
+
+    keep, keep_fingerprints = [], []
+    for i, fp in enumerate(fingerprints):
+        if fp not in seen:
+            seen.add(fp)
+            keep.append(i)
+            keep_fingerprints.append(fp)
+    return keep, keep_fingerprints
+
+
+async def process_bank_csv(
+    file: UploadFile, db, batch_size: int, chunk_size: int
+) -> AsyncIterator[Tuple[List[Dict], int]]:
+    """
+    Streams a bank CSV upload and yields (results, rows) for every
+    `batch_size` rows read. Rows already stored are skipped before scoring,
+    so `results` holds only new rows, each carrying its fingerprint. Each
+    batch is scored against the profiles of the batches before it.
     """
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="Invalid file type. Please upload a CSV.")
 
-    contents = await file.read()
-    file_stream = io.StringIO(contents.decode('utf-8'))
-    reader = csv.reader(file_stream)
+    headers = None
+    has_analysis = False
+    batch = []
+    profiles = UploadProfiles(profile_store)
 
-    try:
-        headers = [h.lower().strip() for h in next(reader)]
-    except StopIteration:
+    async def analyze(rows: List[Dict[str, str]]) -> Tuple[List[Dict], int]:
+        rows_processed.inc('upload', amount=len(rows))
+        with stage('upload', 'dedupe'):
+            keep, fingerprints = await filter_new_rows(db, rows)
+        with stage('upload', 'score'):
+            results = analyze_bank_rows([rows[i] for i in keep], has_analysis, profiles)
+            profiles.observe_rows(results)
+        for result, fp in zip(results, fingerprints):
+            result['fingerprint'] = fp
+        return results, len(rows)
+
+    async for rows in iter_csv_rows(file, chunk_size):
+        for row_data in rows:
+            if headers is None:
+                headers = [h.lower().strip() for h in row_data]
+                has_analysis = all(k in headers for k in ANALYSIS_COLUMNS)
+                continue
+            batch.append(dict(zip(headers, row_data)))
+            if len(batch) >= batch_size:
+                yield await analyze(batch)
+                batch = []
+
+    if headers is None:
         raise HTTPException(status_code=400, detail="CSV file is empty.")
+    if batch:
+        yield await analyze(batch)
+
 
-    processed_rows = []
-    
-    for row_data in reader:
-        row_dict = dict(zip(headers, row_data))
-
-        has_analysis = all(k in row_dict for k in ['score', 'verdict', 'reasons', 'action'])
-
-        if has_analysis:
-            verdict = str(row_dict.get('verdict', 'SAFE')).strip().upper()
-            reasons_raw = str(row_dict.get('reasons', '')).strip()
-            
-            if '•' in reasons_raw:
-                reasons = [r.strip() for r in reasons_raw.split('•')]
-            else:
-                reasons = [r.strip() for r in reasons_raw.split(',')]
-            
-            analysis_result = {
-                'account': str(row_dict.get('account', '')).strip(),
-                'payee': str(row_dict.get('payee', '')).strip().lower(),
-                'amount': float(row_dict.get('amount', 0)),
-                'ts': str(row_dict.get('ts', '')).strip() or datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
-                'score': int(row_dict.get('score', 0)),
-                'verdict': verdict,
-                'reasons': reasons,
-                'action': str(row_dict.get('action', 'Allow • Monitor')).strip()
-            }
-        else:
-            analysis_result = analyze_bank_transaction_row(row_dict)
-        
-        processed_rows.append(analysis_result)
-
-    return processed_rows
\ No newline at end of file
+def is_duplicate_fingerprint(error: Dict) -> bool:
+    """
+    True for a bulk write error raised by the unique fingerprint index.
+    """
+    if error.get('code') != 11000:
+        return False
+    key = error.get('keyPattern')
+    return 'fingerprint' in key if key else 'fingerprint_1' in error.get('errmsg', '')
+
+
+async def store_bank_batch(
+    db, batch: List[Dict], job_id: Optional[str] = None, rows: Optional[List[int]] = None
+) -> Tuple[int, Dict[str, int]]:
+    """
+    Upserts a batch of fingerprinted documents from analyze_bank_rows into
+    `bank_transactions` with one unordered bulk_write, inserting only
+    fingerprints not stored yet, then folds the new rows into the dashboard
+    rollups (the payee/account profiles pick them up from Mongo). Rows of a
+    background job are also tagged with `job_id` and their CSV row number.
+    Returns the number of new documents and their verdict counts.
+    """
+    docs = batch
+    if job_id is not None:
+        for row, doc in zip(rows, docs):
+            doc['job_id'] = job_id
+            doc['row'] = row
+    ops = [UpdateOne({'fingerprint': doc['fingerprint']}, {'$setOnInsert': doc}, upsert=True) for doc in docs]
+    if not ops:
+        return 0, {}
+    with stage('upload', 'insert'):
+        try:
+            result = await db["bank_transactions"].bulk_write(ops, ordered=False)
+            upserted = result.upserted_ids
+        except BulkWriteError as e:
+            # A concurrent upload stored some of the same rows first; any other error is real
+            if e.details.get('writeConcernErrors') or not all(
+                map(is_duplicate_fingerprint, e.details.get('writeErrors', []))
+            ):
+                raise
+            upserted = {u['index']: u['_id'] for u in e.details.get('upserted', [])}
+    new_docs = [docs[i] for i in sorted(upserted)]
+    with stage('upload', 'rollups'):
+        await apply_rollups(db, new_docs, 'bank')
+    return len(new_docs), dict(Counter(d['verdict'] for d in new_docs))
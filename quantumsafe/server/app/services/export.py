@@ -0,0 +1,61 @@
+import csv
+import io
+import json
+import zlib
+from typing import AsyncIterator, Dict
+
+EXPORT_FIELDS = ['account', 'payee', 'amount', 'score', 'verdict', 'reasons', 'action', 'createdAt']
+
+def _csv_row(tx: Dict) -> list:
+    return [
+        tx.get('account'),
+        tx.get('payee'),
+        tx.get('amount'),
+        tx.get('score'),
+        tx.get('verdict'),
+        ' • '.join(tx.get('reasons') or []),
+        tx.get('action'),
+        tx.get('createdAt').strftime('%Y-%m-%d %H:%M:%S') if tx.get('createdAt') else ''
+    ]
+
+def _json_row(tx: Dict) -> Dict:
+    row = {f: tx.get(f) for f in EXPORT_FIELDS}
+    if row['createdAt'] is not None:
+        row['createdAt'] = row['createdAt'].isoformat()
+    return row
+
+async def iter_export_chunks(cursor, fmt: str, chunk_size: int) -> AsyncIterator[bytes]:
+    """
+    Iterates a Motor cursor and yields the export encoded as CSV or NDJSON in
+    chunks of roughly `chunk_size` bytes, so memory stays flat however many
+    documents the cursor returns.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == 'csv':
+        writer.writerow(EXPORT_FIELDS)
+
+    async for tx in cursor:
+        if fmt == 'csv':
+            writer.writerow(_csv_row(tx))
+        else:
+            buffer.write(json.dumps(_json_row(tx), ensure_ascii=False))
+            buffer.write('\n')
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Compresses a byte stream into a single gzip member as it goes.
+    """
+    compressor = zlib.compressobj(wbits=31)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,71 @@
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+
+NdjsonRecord = Tuple[int, Any, Optional[str]]
+
+async def iter_ndjson(stream: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[List[NdjsonRecord]]:
+    """
+    Parses an NDJSON byte stream incrementally. For every chunk received it
+    yields the complete lines as (line_number, value, error) tuples; error is
+    set instead of value for lines that are not valid JSON or exceed
+    `max_line_bytes`. Blank lines are skipped.
+    """
+    buffer = b''
+    line_no = 0
+    overflow = False
+
+    async for chunk in stream:
+        buffer += chunk
+        lines = buffer.split(b'\n')
+        buffer = lines.pop()
+        records = []
+        for line in lines:
+            line_no += 1
+            if overflow:
+                overflow = False
+                records.append((line_no, None, f"Line exceeds {max_line_bytes} bytes"))
+            elif line.strip():
+                records.append(_parse(line_no, line))
+        if len(buffer) > max_line_bytes:
+            # Drop the oversized line now and report it once its newline arrives
+            buffer, overflow = b'', True
+        if records:
+            yield records
+
+    if overflow:
+        yield [(line_no + 1, None, f"Line exceeds {max_line_bytes} bytes")]
+    elif buffer.strip():
+        yield [_parse(line_no + 1, buffer)]
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    A StreamingResponse whose body is produced while the request body is
+    still being read. StreamingResponse normally runs listen_for_disconnect
+    next to the body on ASGI servers older than spec 2.4 (e.g. uvicorn 0.35),
+    and that listener shares `receive` and swallows the request body
+    messages. Here only the body generator reads `receive`; a client that
+    goes away surfaces as ClientDisconnect from request.stream() instead.
+    """
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+        if self.background is not None:
+            await self.background()
+
+def _parse(line_no: int, line: bytes) -> NdjsonRecord:
+    try:
+        return line_no, json.loads(line), None
+    except ValueError as e:
+        return line_no, None, f"Invalid JSON: {e}"
+
+def dump_lines(records: List[Dict[str, Any]]) -> bytes:
+    """
+    Encodes a list of result objects as NDJSON.
+    """
+    return ''.join(
+        json.dumps(r, ensure_ascii=False, separators=(',', ':'), default=str) + '\n' for r in records
+    ).encode('utf-8')
@@ -0,0 +1,51 @@
+import base64
+from typing import Any, Dict, List, Optional, Tuple
+from bson import json_util
+
+# Sort keys for each results `order` mode. Every key ends in _id so ties on
+# createdAt/score still give a strict order for keyset pagination.
+SORT_ORDERS: Dict[str, List[Tuple[str, int]]] = {
+    'new': [("createdAt", -1), ("_id", -1)],
+    'old': [("createdAt", 1), ("_id", 1)],
+    'hi': [("score", -1), ("createdAt", -1), ("_id", -1)],
+    'lo': [("score", 1), ("createdAt", -1), ("_id", -1)],
+}
+
+def encode_cursor(doc: Dict[str, Any], order: str) -> str:
+    """
+    Builds the opaque `next` token from the last document of a page.
+    """
+    values = [doc.get(field) for field, _ in SORT_ORDERS[order]]
+    raw = json_util.dumps({"o": order, "k": values}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(token: str, order: str) -> List[Any]:
+    """
+    Returns the sort key values stored in a token, or raises ValueError if
+    the token is malformed or was issued for a different order.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        data = json_util.loads(raw)
+    except Exception as e:
+        raise ValueError("Malformed cursor") from e
+    if not isinstance(data, dict) or data.get("o") != order or len(data.get("k", [])) != len(SORT_ORDERS[order]):
+        raise ValueError("Cursor does not match the requested order")
+    return data["k"]
+
+def apply_cursor(query: Dict[str, Any], order: str, cursor: Optional[str]) -> Dict[str, Any]:
+    """
+    Restricts `query` to documents strictly after the cursor position, e.g.
+    for 'new': createdAt < c OR (createdAt == c AND _id < id).
+    """
+    if not cursor:
+        return query
+    values = decode_cursor(cursor, order)
+    keys = SORT_ORDERS[order]
+    clauses = []
+    for i, (field, direction) in enumerate(keys):
+        clause = {f: v for (f, _), v in zip(keys[:i], values[:i])}
+        clause[field] = {"$lt" if direction < 0 else "$gt": values[i]}
+        clauses.append(clause)
+    keyset = {"$or": clauses}
+    return {"$and": [query, keyset]} if query else keyset
@@ -0,0 +1,244 @@
+import asyncio
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from pymongo.errors import PyMongoError
+
+SNAPSHOT_VERSION = 2
+EPOCH = datetime(1970, 1, 1)
+
+def _epoch_seconds(when: datetime) -> float:
+    # Stored datetimes are naive UTC; .timestamp() would treat them as local time
+    return (when - EPOCH).total_seconds() if when.tzinfo is None else when.timestamp()
+
+class Profile:
+    """
+    Running history of one payee or account: first/last seen (epoch
+    seconds), transaction count and Welford mean/M2 of the amount.
+    """
+    __slots__ = ('first_seen', 'last_ts', 'count', 'mean', 'm2')
+
+    def __init__(self, first_seen: float = 0.0, last_ts: float = 0.0, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.first_seen = first_seen
+        self.last_ts = last_ts
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def update(self, amount: float, ts: float):
+        if not self.count:
+            self.first_seen = ts
+        self.count += 1
+        delta = amount - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (amount - self.mean)
+        self.last_ts = max(self.last_ts, ts)
+
+    def merged(self, other: "Profile") -> "Profile":
+        """
+        Returns the profile of both histories together (Chan et al.'s
+        pairwise update of the Welford mean/M2).
+        """
+        if not other.count:
+            return Profile(self.first_seen, self.last_ts, self.count, self.mean, self.m2)
+        if not self.count:
+            return Profile(other.first_seen, other.last_ts, other.count, other.mean, other.m2)
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        return Profile(
+            min(self.first_seen, other.first_seen), max(self.last_ts, other.last_ts), count,
+            self.mean + delta * other.count / count,
+            self.m2 + other.m2 + delta * delta * self.count * other.count / count,
+        )
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return self.variance ** 0.5
+
+class ProfileStore:
+    """
+    LRU-bounded map of ('payee' | 'account', key) -> Profile, built by
+    replaying bank_transactions in createdAt order and snapshotted to disk
+    so a restart only has to replay rows newer than the snapshot.
+
+    The store is process-local: every uvicorn worker holds its own copy.
+    Ingest does not update it directly; instead each copy replays new rows
+    from Mongo every `sync_seconds`, up to `lag_seconds` ago (so rows still
+    being inserted are not skipped past), and all workers converge on the
+    same profiles whichever one stored the rows. Rows younger than the lag
+    are not reflected yet, except to the upload that stored them (see
+    UploadProfiles). Lookups and updates are locked, since background
+    jobs score in threads.
+    """
+    def __init__(self):
+        self._profiles: "OrderedDict[Tuple[str, str], Profile]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_entries = 500_000
+        self.watermark: Optional[datetime] = None
+        self.sync_seconds = 5.0
+        self.lag_seconds = 10.0
+        self._task: asyncio.Task = None
+
+    def __len__(self) -> int:
+        return len(self._profiles)
+
+    def get(self, kind: str, key: str) -> Optional[Profile]:
+        with self._lock:
+            profile = self._profiles.get((kind, key))
+            if profile is not None:
+                self._profiles.move_to_end((kind, key))
+            return profile
+
+    def observe(self, kind: str, key: str, amount: float, ts: float):
+        with self._lock:
+            profile = self._profiles.get((kind, key))
+            if profile is None:
+                profile = self._profiles[(kind, key)] = Profile()
+                if len(self._profiles) > self.max_entries:
+                    self._profiles.popitem(last=False)
+            else:
+                self._profiles.move_to_end((kind, key))
+            profile.update(amount, ts)
+
+    def observe_rows(self, rows: Iterable[Dict]):
+        """
+        Folds stored bank_transactions documents into the profiles.
+        """
+        for row in rows:
+            when = row.get('ts') or row.get('createdAt')
+            ts = _epoch_seconds(when) if when else 0.0
+            amount = float(row.get('amount') or 0.0)
+            if row.get('payee'):
+                self.observe('payee', row['payee'], amount, ts)
+            if row.get('account'):
+                self.observe('account', row['account'], amount, ts)
+            created = row.get('createdAt')
+            if created and (self.watermark is None or created > self.watermark):
+                self.watermark = created
+
+    async def sync_from_db(self, db, batch_size: int = 5000) -> int:
+        """
+        Replays bank_transactions created after the watermark and at least
+        `lag_seconds` ago, oldest first. Returns the number of rows replayed.
+        """
+        created = {'$lt': datetime.utcnow() - timedelta(seconds=self.lag_seconds)}
+        if self.watermark:
+            created['$gt'] = self.watermark
+        projection = {'_id': 0, 'account': 1, 'payee': 1, 'amount': 1, 'ts': 1, 'createdAt': 1}
+        cursor = db["bank_transactions"].find({'createdAt': created}, projection).sort('createdAt', 1).batch_size(batch_size)
+        seen = 0
+        async for row in cursor:
+            self.observe_rows((row,))
+            seen += 1
+        return seen
+
+    async def build_from_db(self, db, batch_size: int = 5000):
+        seen = await self.sync_from_db(db, batch_size)
+        print(f"Profile store: replayed {seen} transactions, {len(self)} profiles.")
+
+    def start(self, db, sync_seconds: float, lag_seconds: float):
+        """
+        Starts replaying new rows from Mongo every `sync_seconds`.
+        """
+        self.sync_seconds = sync_seconds
+        self.lag_seconds = lag_seconds
+        self._task = asyncio.create_task(self._run(db))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, db):
+        while True:
+            await asyncio.sleep(self.sync_seconds)
+            try:
+                await self.sync_from_db(db)
+            except PyMongoError as e:
+                print(f"Profile store sync failed: {e}")
+
+    def snapshot(self, path: str):
+        """
+        Writes all profiles and the watermark to `path` as JSON, atomically.
+        Every worker writes the same path on shutdown; since their stores
+        converge, whichever snapshot lands last is as good as any.
+        """
+        with self._lock:
+            data = {
+                'version': SNAPSHOT_VERSION,
+                'watermark': self.watermark.isoformat() if self.watermark else None,
+                'profiles': [
+                    [kind, key, p.first_seen, p.last_ts, p.count, p.mean, p.m2]
+                    for (kind, key), p in self._profiles.items()
+                ],
+            }
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp, path)
+
+    def load_snapshot(self, path: str) -> bool:
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != SNAPSHOT_VERSION:
+                return False
+            profiles = OrderedDict(
+                ((str(kind), str(key)), Profile(float(first), float(last), int(count), float(mean), float(m2)))
+                for kind, key, first, last, count, mean, m2 in data['profiles']
+            )
+            watermark = datetime.fromisoformat(data['watermark']) if data['watermark'] else None
+        except (OSError, ValueError, TypeError, KeyError, AttributeError) as e:
+            print(f"Ignoring unreadable profile snapshot {path}: {e}")
+            return False
+        self._profiles = profiles
+        while len(self._profiles) > self.max_entries:
+            self._profiles.popitem(last=False)
+        self.watermark = watermark
+        print(f"Profile store: loaded {len(self)} profiles from snapshot.")
+        return True
+
+class UploadProfiles:
+    """
+    Profiles seen by one upload or job: the shared store plus the batches
+    this upload has scored so far, which the store only picks up from Mongo
+    on a later sync. Each batch is kept as its own small ProfileStore and
+    dropped once the shared store's watermark passes its createdAt, so no
+    row counts twice. Lookups merge the store's profile with the batches'.
+    """
+    def __init__(self, store: ProfileStore):
+        self.store = store
+        self._batches: List[ProfileStore] = []
+
+    def observe_rows(self, rows: Iterable[Dict]):
+        batch = ProfileStore()
+        batch.observe_rows(rows)
+        if len(batch):
+            self._batches.append(batch)
+        watermark = self.store.watermark
+        if watermark is not None:
+            self._batches = [b for b in self._batches if b.watermark is None or b.watermark > watermark]
+
+    def get(self, kind: str, key: str) -> Optional[Profile]:
+        profile = self.store.get(kind, key)
+        for batch in self._batches:
+            seen = batch.get(kind, key)
+            if seen is not None:
+                profile = seen if profile is None else profile.merged(seen)
+        return profile
+
+profile_store = ProfileStore()
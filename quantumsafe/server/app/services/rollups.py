@@ -0,0 +1,88 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+# Scores fall into 10-point buckets keyed by their lower bound; 100 joins "90"
+SCORE_BUCKET_WIDTH = 10
+BANK_FEATURE = 'bank'
+
+def score_bucket(score) -> str:
+    return str(min(int(score or 0) // SCORE_BUCKET_WIDTH * SCORE_BUCKET_WIDTH, 100 - SCORE_BUCKET_WIDTH))
+
+def rollup_updates(source: str, docs: Iterable[Dict]) -> List[UpdateOne]:
+    """
+    Folds stored analyses into one $inc upsert per (source, day, feature)
+    rollup document: a row count, counts per verdict, a score histogram and
+    a score sum for averages.
+    """
+    increments: Dict[tuple, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for doc in docs:
+        created = doc.get('createdAt') or datetime.utcnow()
+        feature = doc.get('feature') or BANK_FEATURE
+        inc = increments[(created.strftime('%Y-%m-%d'), feature)]
+        inc['count'] += 1
+        inc[f"verdicts.{doc.get('verdict') or 'UNKNOWN'}"] += 1
+        inc[f"scores.{score_bucket(doc.get('score'))}"] += 1
+        inc['score_sum'] += doc.get('score') or 0
+
+    return [
+        UpdateOne(
+            {'_id': f"{source}|{day}|{feature}"},
+            {'$inc': dict(inc), '$setOnInsert': {'source': source, 'day': day, 'feature': feature}},
+            upsert=True
+        )
+        for (day, feature), inc in increments.items()
+    ]
+
+async def apply_rollups(db, docs: List[Dict], source: str):
+    """
+    Adds newly stored `bank_transactions` ('bank') or `common_analyses`
+    ('common') documents to the rollups. A failure is logged rather than
+    raised, since the documents themselves are already stored.
+    """
+    updates = rollup_updates(source, docs)
+    if not updates:
+        return
+    try:
+        await db["rollups"].bulk_write(updates, ordered=False)
+    except PyMongoError as e:
+        print(f"Rollup update for {len(docs)} {source} documents failed: {e}")
+
+async def summarize(
+    db, source: str, from_day: Optional[str] = None, to_day: Optional[str] = None, feature: Optional[str] = None
+) -> Dict:
+    """
+    Sums the rollup documents of a day range (default: the last 30 days)
+    into totals, per-verdict, per-feature and per-day counts and a score
+    histogram. Reads at most one document per day and feature.
+    """
+    to_day = to_day or datetime.utcnow().strftime('%Y-%m-%d')
+    from_day = from_day or (datetime.fromisoformat(to_day) - timedelta(days=29)).strftime('%Y-%m-%d')
+    query = {'source': source, 'day': {'$gte': from_day, '$lte': to_day}}
+    if feature and feature != 'all':
+        query['feature'] = feature
+
+    summary = {
+        'source': source, 'from_day': from_day, 'to_day': to_day, 'total': 0, 'average_score': 0.0,
+        'verdicts': defaultdict(int), 'features': defaultdict(int), 'scores': defaultdict(int), 'days': {},
+    }
+    score_sum = 0.0
+    async for doc in db["rollups"].find(query).sort('day', 1):
+        summary['total'] += doc['count']
+        score_sum += doc.get('score_sum', 0)
+        summary['features'][doc['feature']] += doc['count']
+        day = summary['days'].setdefault(doc['day'], {'day': doc['day'], 'total': 0, 'verdicts': defaultdict(int)})
+        day['total'] += doc['count']
+        for verdict, count in doc.get('verdicts', {}).items():
+            summary['verdicts'][verdict] += count
+            day['verdicts'][verdict] += count
+        for bucket, count in doc.get('scores', {}).items():
+            summary['scores'][bucket] += count
+
+    if summary['total']:
+        summary['average_score'] = round(score_sum / summary['total'], 2)
+    summary['scores'] = {b: summary['scores'][b] for b in sorted(summary['scores'], key=int)}
+    summary['days'] = list(summary['days'].values())
+    return summary
@@ -0,0 +1,142 @@
+import json
+import os
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Pattern
+
+DEFAULT_RULES_PATH = Path(__file__).resolve().parent.parent / "data" / "chatbot_rules.json"
+
+@dataclass(frozen=True)
+class RuleCategory:
+    id: str
+    reason: str
+    risk: int
+
+def _trie_regex(node: Dict) -> str:
+    """
+    Emits a regex for a character trie, sharing common prefixes so matching
+    at a position costs the depth of the trie, not the number of phrases.
+    """
+    alternatives = [re.escape(ch) + _trie_regex(child) for ch, child in sorted(node.items()) if ch]
+    if not alternatives:
+        return ''
+    if len(alternatives) == 1 and '' not in node:
+        return alternatives[0]
+    group = '(?:' + '|'.join(alternatives) + ')'
+    return group + '?' if '' in node else group
+
+class CompiledRules:
+    """
+    A rule pack compiled into one trie-shaped regex over every phrase of
+    every category. A single scan of the message returns all matched
+    categories, in the order they appear in the pack.
+    """
+    def __init__(self, pack: Dict):
+        self.version = pack.get("version")
+        self.upi_re: Pattern = re.compile(pack["upi_pattern"])
+        self.categories: List[RuleCategory] = []
+        self.phrase_categories: Dict[str, List[int]] = {}
+
+        trie: Dict = {}
+        for index, cat in enumerate(pack["categories"]):
+            self.categories.append(RuleCategory(cat["id"], cat["reason"], int(cat["risk"])))
+            for phrase in cat["phrases"]:
+                phrase = phrase.lower()
+                if not phrase:
+                    continue
+                self.phrase_categories.setdefault(phrase, []).append(index)
+                node = trie
+                for ch in phrase:
+                    node = node.setdefault(ch, {})
+                node[''] = {}
+
+        self.pattern = re.compile(_trie_regex(trie)) if trie else None
+
+    @property
+    def phrase_count(self) -> int:
+        return len(self.phrase_categories)
+
+    def match(self, text: str) -> List[RuleCategory]:
+        """
+        Returns the categories with at least one phrase in `text` (already lowercased).
+        """
+        if self.pattern is None:
+            return []
+        hit = set()
+        search = self.pattern.search
+        m = search(text)
+        while m is not None:
+            longest = m.group()
+            # The trie regex is greedy; shorter phrases that prefix the match also count
+            for end in range(1, len(longest) + 1):
+                hit.update(self.phrase_categories.get(longest[:end], ()))
+            if len(hit) == len(self.categories):
+                break
+            # Restart one character in, so phrases overlapping this match are still found
+            m = search(text, m.start() + 1)
+        return [self.categories[i] for i in sorted(hit)]
+
+class RuleEngine:
+    """
+    Holds the active rule pack and swaps in a recompiled one when the file
+    changes on disk, checked at most every `reload_seconds`.
+    """
+    def __init__(self):
+        self.path: Path = DEFAULT_RULES_PATH
+        self.reload_seconds = 5.0
+        self._rules: Optional[CompiledRules] = None
+        self._mtime = 0.0
+        self._checked_at = 0.0
+        self.reloads = 0
+
+    def load(self, path: Optional[str] = None, reload_seconds: Optional[float] = None):
+        if path:
+            self.path = Path(path)
+        if reload_seconds is not None:
+            self.reload_seconds = reload_seconds
+        self.reload()
+
+    def reload(self) -> CompiledRules:
+        """
+        Recompiles the pack from disk. A broken file keeps the previous pack active.
+        """
+        mtime = os.stat(self.path).st_mtime
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                rules = CompiledRules(json.load(f))
+        except (ValueError, KeyError, re.error) as e:
+            if self._rules is None:
+                raise
+            print(f"Ignoring invalid rule pack {self.path}: {e}")
+            rules = self._rules
+        else:
+            self.reloads += 1
+        self._rules, self._mtime, self._checked_at = rules, mtime, time.monotonic()
+        return rules
+
+    def current(self) -> CompiledRules:
+        if self._rules is None:
+            return self.reload()
+        now = time.monotonic()
+        if now - self._checked_at >= self.reload_seconds:
+            self._checked_at = now
+            try:
+                if os.stat(self.path).st_mtime != self._mtime:
+                    return self.reload()
+            except OSError:
+                pass
+        return self._rules
+
+    def info(self) -> Dict:
+        rules = self.current()
+        return {
+            "path": str(self.path),
+            "version": rules.version,
+            "categories": [c.id for c in rules.categories],
+            "phrases": rules.phrase_count,
+            "reloads": self.reloads,
+        }
+
+chatbot_rules = RuleEngine()
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+# Windows are listed shortest first; the last one bounds the $match.
+VELOCITY_WINDOWS = {
+    '1h': timedelta(hours=1),
+    '24h': timedelta(hours=24),
+    '7d': timedelta(days=7),
+}
+
+VELOCITY_GROUPS = ('payee', 'account')
+
+def velocity_pipeline(group_by: str, now: datetime, keys: Optional[List[str]], limit: int) -> List[Dict]:
+    """
+    Builds the aggregation that computes count and total per window in one
+    pass over the widest window. Only ts, amount and the group key are read,
+    so the (key, ts, amount) / (ts, payee, account, amount) indexes cover it.
+    """
+    widest = max(VELOCITY_WINDOWS.values())
+    match = {'ts': {'$gt': now - widest, '$lte': now}}
+    if keys:
+        match[group_by] = {'$in': keys}
+
+    group = {'_id': f'${group_by}'}
+    for name, delta in VELOCITY_WINDOWS.items():
+        in_window = {'$gt': ['$ts', now - delta]}
+        group[f'count_{name}'] = {'$sum': {'$cond': [in_window, 1, 0]}}
+        group[f'total_{name}'] = {'$sum': {'$cond': [in_window, '$amount', 0]}}
+
+    last = list(VELOCITY_WINDOWS)[-1]
+    return [
+        {'$match': match},
+        {'$group': group},
+        {'$sort': {f'count_{last}': -1, '_id': 1}},
+        {'$limit': limit},
+    ]
+
+async def compute_velocity(
+    db, group_by: str, now: Optional[datetime] = None,
+    keys: Optional[List[str]] = None, limit: int = 100
+) -> List[Dict]:
+    """
+    Returns per-payee or per-account count/total/average over each window,
+    computed inside Mongo from stored bank_transactions.
+    """
+    if group_by not in VELOCITY_GROUPS:
+        raise ValueError(f"group_by must be one of {', '.join(VELOCITY_GROUPS)}")
+    now = now or datetime.utcnow()
+    pipeline = velocity_pipeline(group_by, now, keys, limit)
+    docs = await db["bank_transactions"].aggregate(pipeline, allowDiskUse=True).to_list(length=limit)
+
+    groups = []
+    for doc in docs:
+        windows = {}
+        for name in VELOCITY_WINDOWS:
+            count, total = doc[f'count_{name}'], round(doc[f'total_{name}'], 2)
+            windows[name] = {'count': count, 'total': total, 'avg': round(total / count, 2) if count else 0.0}
+        groups.append({'group_by': group_by, 'key': doc['_id'], 'windows': windows})
+    return groups
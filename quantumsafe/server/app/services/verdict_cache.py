@@ -0,0 +1,98 @@
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from pymongo.errors import PyMongoError
+
+class VerdictCache:
+    """
+    Caches image verdicts by content hash + qr_text. Lookups hit an
+    in-process LRU first and then, if configured, a Mongo collection shared
+    by all workers. Entries expire after `ttl_seconds` in both tiers.
+    """
+    def __init__(self):
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.max_size = 0
+        self.ttl_seconds = 0
+        self.collection = None
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    async def start(self, max_size: int, ttl_seconds: int, collection=None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.collection = collection
+        if collection is not None:
+            await collection.create_index("createdAt", expireAfterSeconds=ttl_seconds)
+
+    @staticmethod
+    def make_key(image_bytes: bytes, qr_text: Optional[str]) -> str:
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        qr_digest = hashlib.sha256((qr_text or '').encode()).hexdigest()[:16]
+        return f"{digest}:{qr_digest}"
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires, value = entry
+            if expires > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+
+        if self.collection is not None:
+            try:
+                doc = await self.collection.find_one({
+                    "_id": key,
+                    "createdAt": {"$gte": datetime.utcnow() - timedelta(seconds=self.ttl_seconds)}
+                })
+            except PyMongoError:
+                doc = None
+            if doc is not None:
+                self.shared_hits += 1
+                self._remember(key, doc["result"])
+                return doc["result"]
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Dict[str, Any]):
+        self._remember(key, value)
+        if self.collection is not None:
+            try:
+                await self.collection.replace_one(
+                    {"_id": key}, {"result": value, "createdAt": datetime.utcnow()}, upsert=True
+                )
+            except PyMongoError:
+                pass
+
+    def _remember(self, key: str, value: Dict[str, Any]):
+        if self.max_size <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.shared_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+image_verdict_cache = VerdictCache()
+
+def get_image_verdict_cache() -> VerdictCache:
+    """
+    Returns the image verdict cache.
+    """
+    return image_verdict_cache
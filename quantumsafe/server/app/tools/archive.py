@@ -0,0 +1,45 @@
+"""
+Runs a retention sweep now, or restores an archived range.
+
+Run from the server directory:
+    python -m app.tools.archive sweep
+    python -m app.tools.archive restore bank_transactions 2025-01-01 [2025-01-31] [--feature chatbot]
+"""
+import argparse
+import asyncio
+
+from ..core.config import settings
+from ..core.db import close_mongo_connection, connect_to_mongo, get_database
+from ..services.archive import ARCHIVED_COLLECTIONS, restore_range, retention_sweeper
+
+
+async def main(args):
+    await connect_to_mongo()
+    try:
+        db = get_database()
+        if args.command == 'sweep':
+            retention_sweeper.configure(
+                db, settings.ARCHIVE_DIR, settings.RETENTION_DAYS, settings.RETENTION_FEATURE_DAYS,
+                settings.RETENTION_BATCH_SIZE, settings.RETENTION_SWEEP_SECONDS, settings.RETENTION_RESTORED_DAYS
+            )
+            print(f"Archived: {await retention_sweeper.sweep() or 'nothing'}")
+        else:
+            filters = {'feature': args.feature} if args.feature else None
+            read, inserted = await restore_range(
+                db, settings.ARCHIVE_DIR, args.collection, args.from_date, args.to_date or args.from_date, filters
+            )
+            print(f"Read {read} archived documents, inserted {inserted}.")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('sweep', help="archive and delete expired documents now")
+    restore = commands.add_parser('restore', help="re-import an archived day range")
+    restore.add_argument('collection', choices=ARCHIVED_COLLECTIONS)
+    restore.add_argument('from_date', help="YYYY-MM-DD")
+    restore.add_argument('to_date', nargs='?', help="YYYY-MM-DD, defaults to from_date")
+    restore.add_argument('--feature')
+    asyncio.run(main(parser.parse_args()))
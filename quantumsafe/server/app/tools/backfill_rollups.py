@@ -0,0 +1,87 @@
+"""
+Rebuilds the dashboard rollups from the stored analyses: the archived
+partitions (see services/archive.py) and the live collection. Documents
+restored from the archive are counted once, from the archive.
+
+Run from the server directory, ideally while uploads and retention sweeps
+are paused (rows stored or archived during the rebuild may be counted twice
+or not at all):
+    python -m app.tools.backfill_rollups [--source bank|common|all] [--no-archive]
+"""
+import argparse
+import asyncio
+from typing import Set
+
+from ..core.config import settings
+from ..core.db import close_mongo_connection, connect_to_mongo, get_database
+from ..services.archive import iter_archive
+from ..services.rollups import apply_rollups
+
+SOURCES = {'bank': 'bank_transactions', 'common': 'common_analyses'}
+PROJECTION = {'_id': 1, 'createdAt': 1, 'feature': 1, 'verdict': 1, 'score': 1}
+
+
+async def replay_archive(db, source: str, archive_dir: str, batch_size: int) -> Set:
+    """
+    Rolls up every archived document of `source` once and returns their _ids.
+    A document archived twice (a sweep interrupted between writing and
+    deleting a batch) is counted once.
+    """
+    docs = iter_archive(archive_dir, SOURCES[source], '0000-01-01', '9999-12-31')
+    seen = set()
+    while True:
+        batch = await asyncio.to_thread(lambda: [doc for _, doc in zip(range(batch_size), docs)])
+        if not batch:
+            return seen
+        fresh = []
+        for doc in batch:
+            if doc['_id'] not in seen:
+                seen.add(doc['_id'])
+                fresh.append(doc)
+        await apply_rollups(db, fresh, source)
+
+
+async def backfill(source: str, batch_size: int, archive_dir: str = None):
+    db = get_database()
+    deleted = await db["rollups"].delete_many({'source': source})
+    print(f"{source}: cleared {deleted.deleted_count} rollup documents.")
+
+    archived = await replay_archive(db, source, archive_dir, batch_size) if archive_dir else set()
+    if archive_dir:
+        print(f"{source}: rolled up {len(archived)} archived documents.")
+
+    batch, seen = [], 0
+    cursor = db[SOURCES[source]].find({'restoredAt': {'$exists': False}}, PROJECTION).batch_size(batch_size)
+    async for doc in cursor:
+        if doc['_id'] in archived:
+            continue
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            await apply_rollups(db, batch, source)
+            seen += len(batch)
+            batch = []
+    if batch:
+        await apply_rollups(db, batch, source)
+        seen += len(batch)
+    print(f"{source}: rolled up {seen} live documents.")
+
+
+async def main(sources, batch_size: int, archive_dir: str):
+    await connect_to_mongo()
+    try:
+        for source in sources:
+            await backfill(source, batch_size, archive_dir)
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source', choices=['bank', 'common', 'all'], default='all')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--no-archive', action='store_true', help="count only the live collection")
+    args = parser.parse_args()
+    asyncio.run(main(
+        list(SOURCES) if args.source == 'all' else [args.source], args.batch_size,
+        None if args.no_archive else settings.ARCHIVE_DIR
+    ))
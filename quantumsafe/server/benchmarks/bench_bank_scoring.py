@@ -0,0 +1,57 @@
+"""
+Compares the per-row bank scorer with the batch scorer, both up to the
+documents store_bank_batch writes: the per-row path scores each row and
+validates it through BankTransaction (as storage did before), the batch
+path builds the documents column-wise. With --profiles both paths score
+against a ProfileStore primed with the same rows (the per-row scorer does
+not use profiles, so only the batch path pays for the lookups).
+
+Run from the server directory:
+    python -m benchmarks.bench_bank_scoring --rows 1000 10000 100000 [--profiles]
+"""
+import argparse
+import time
+
+from app.models.bank import BankTransaction
+from app.services.analysis import analyze_bank_transaction_row, score_bank_rows
+from app.services.csv_handler import parse_ts
+from app.services.profiles import ProfileStore
+from .datagen import make_bank_rows
+
+
+def timed(fn, rows, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(rows)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def per_row(rows):
+    return [
+        BankTransaction(**{**r, 'ts': parse_ts(r['ts'])}).model_dump(by_alias=True)
+        for r in map(analyze_bank_transaction_row, rows)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--profiles', action='store_true')
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'per-row rows/s':>16} {'batch rows/s':>14} {'speedup':>8}")
+    for n in args.rows:
+        rows = make_bank_rows(n)
+        profiles = None
+        if args.profiles:
+            profiles = ProfileStore()
+            profiles.observe_rows(score_bank_rows(rows))
+        slow = timed(per_row, rows)
+        batch = timed(lambda rs: score_bank_rows(rs, profiles), rows)
+        print(f"{n:>10} {n / slow:>16,.0f} {n / batch:>14,.0f} {slow / batch:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Compares the compiled chatbot rule matcher with a per-phrase substring scan
+over message length and rule count.
+
+Run from the server directory:
+    python -m benchmarks.bench_chatbot_rules --rules 10 1000 5000 --lengths 100 1000 10000
+"""
+import argparse
+import random
+import string
+import time
+
+from app.services.rules import CompiledRules
+
+
+def make_pack(n_phrases: int, n_categories: int = 8, seed: int = 11):
+    rnd = random.Random(seed)
+    word = lambda: ''.join(rnd.choices(string.ascii_lowercase, k=rnd.randint(3, 9)))
+    categories = [
+        {"id": f"c{i}", "reason": f"Category {i}", "risk": 5, "phrases": []}
+        for i in range(n_categories)
+    ]
+    for i in range(n_phrases):
+        phrase = ' '.join(word() for _ in range(rnd.randint(1, 3)))
+        categories[i % n_categories]["phrases"].append(phrase)
+    return {"version": 0, "upi_pattern": r"^[a-z0-9._-]{2,}@[a-z]{2,}$", "categories": categories}
+
+
+def make_message(length: int, seed: int = 5) -> str:
+    rnd = random.Random(seed)
+    return ''.join(rnd.choices(string.ascii_lowercase + '    ', k=length))
+
+
+def naive_match(pack, text):
+    return [c["id"] for c in pack["categories"] if any(p in text for p in c["phrases"])]
+
+
+def per_call_us(fn, text, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(text)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rules', type=int, nargs='+', default=[10, 1000, 5000])
+    parser.add_argument('--lengths', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'phrases':>8} {'msg chars':>10} {'scan us':>12} {'compiled us':>12} {'speedup':>8}")
+    for n_rules in args.rules:
+        pack = make_pack(n_rules)
+        compiled = CompiledRules(pack)
+        for length in args.lengths:
+            text = make_message(length)
+            naive = per_call_us(lambda t: naive_match(pack, t), text, args.repeat)
+            fast = per_call_us(compiled.match, text, args.repeat)
+            print(f"{n_rules:>8} {length:>10} {naive:>12,.1f} {fast:>12,.1f} {naive / fast:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Measures server-side QR decoding: ms/image and decode rate for each single
+pass of analysis.QR_PASSES, and for the cascade the endpoint uses (which
+stops at the first pass that decodes).
+
+The corpus holds images that really contain a QR code: quantumsafe/qr.jpg
+(a dark-mode UPI code) plus codes generated with OpenCV's encoder, each
+rendered dark-on-light and light-on-dark, small and large, placed on a
+larger noisy canvas and re-encoded as JPEG. The sample uploads under
+php/uploads (receipts, invoices and screenshots without a code) are timed
+separately as "cascade, no code": most uploads carry no code, so that row
+is the regression number to watch (it only pays for the detection gate).
+
+Run from the server directory (needs opencv-python):
+    python -m benchmarks.bench_qr [--files ../qr.jpg] [--generated 24] [--negatives ../php/uploads] [--repeat 5]
+"""
+import argparse
+import glob
+import io
+import os
+import random
+import time
+
+import numpy as np
+from PIL import Image
+
+from app.core.config import settings
+from app.services import analysis
+from .datagen import UPLOADS_DIR
+
+QR_SAMPLE = os.path.join(os.path.dirname(__file__), '..', '..', 'qr.jpg')
+
+
+def load_images(paths, max_side):
+    images = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            image = analysis.decode_image(f.read())
+        if image is not None:
+            images.append((os.path.basename(path), analysis.working_copy(image, max_side)))
+    return images
+
+
+def generate_images(n, max_side, seed=11):
+    """
+    `n` synthetic photos/screenshots of QR codes with known payloads.
+    """
+    cv2 = analysis.cv2
+    rnd = random.Random(seed)
+    encoder = cv2.QRCodeEncoder.create()
+    images = []
+    for i in range(n):
+        payload = rnd.choice((
+            f"upi://pay?pa=merchant{i}@ybl&pn=Shop%20{i}&am={rnd.randint(10, 9999)}",
+            f"https://bit.ly/{rnd.randrange(16 ** 6):06x}",
+        ))
+        code = encoder.encode(payload)
+        module = rnd.choice((3, 6, 12))
+        code = cv2.resize(code, None, fx=module, fy=module, interpolation=cv2.INTER_NEAREST)
+        inverted = i % 2 == 1
+        if inverted:
+            code = 255 - code
+        width, height = rnd.choice(((1080, 1920), (1440, 2560), (800, 1200)))
+        canvas = np.random.default_rng(i).normal(30 if inverted else 225, 12, (height, width)).clip(0, 255).astype(np.uint8)
+        top, left = rnd.randint(0, height - code.shape[0]), rnd.randint(0, width - code.shape[1])
+        canvas[top:top + code.shape[0], left:left + code.shape[1]] = code
+        buffer = io.BytesIO()
+        Image.fromarray(canvas).convert('RGB').save(buffer, 'JPEG', quality=rnd.choice((60, 80, 95)))
+        image = analysis.working_copy(analysis.decode_image(buffer.getvalue()), max_side)
+        images.append((f"generated-{i:02d}{'-inverted' if inverted else ''}-{module}px", image))
+    return images
+
+
+def run_pass(images, passes, repeat):
+    """
+    Returns (mean ms/image, images decoded, index of the winning pass per image).
+    """
+    total, decoded, winners = 0.0, 0, []
+    for _, image in images:
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            text, index = analysis.decode_qr(image, passes)
+            best = min(best, time.perf_counter() - start)
+        total += best
+        decoded += bool(text)
+        winners.append(index)
+    return total * 1000 / max(1, len(images)), decoded, winners
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', nargs='*', default=[QR_SAMPLE], help="images that contain a QR code")
+    parser.add_argument('--generated', type=int, default=24)
+    parser.add_argument('--negatives', nargs='*', default=[UPLOADS_DIR],
+                        help="directories (searched recursively) of images without a QR code")
+    parser.add_argument('--max-side', type=int, default=settings.IMAGE_WORKING_MAX_SIDE)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if analysis.cv2 is None:
+        raise SystemExit("opencv-python is not installed; server-side QR decoding is disabled.")
+    images = load_images(args.files, args.max_side) + generate_images(args.generated, args.max_side)
+    negatives = load_images(
+        [p for directory in args.negatives for p in sorted(glob.glob(os.path.join(directory, '**', '*'), recursive=True))
+         if p.lower().endswith(('.jpg', '.jpeg', '.png'))], args.max_side
+    )
+    if not images:
+        raise SystemExit("No QR images to measure.")
+
+    print(f"{len(images)} QR images, {len(negatives)} without a code, at working resolution <= {args.max_side}px\n")
+    print(f"{'pass':<18} {'ms/image':>10} {'decoded':>9} {'rate':>7}")
+    for side in analysis.QR_PASSES:
+        ms, decoded, _ = run_pass(images, (side,), args.repeat)
+        label = f"{side}px" if side else "working res"
+        print(f"{label:<18} {ms:>10.2f} {decoded:>9} {decoded / len(images):>7.0%}")
+
+    ms, decoded, winners = run_pass(images, analysis.QR_PASSES, args.repeat)
+    print(f"{'cascade':<18} {ms:>10.2f} {decoded:>9} {decoded / len(images):>7.0%}")
+    if negatives:
+        ms, found, _ = run_pass(negatives, analysis.QR_PASSES, args.repeat)
+        print(f"{'cascade, no code':<18} {ms:>10.2f} {found:>9} {'':>7}")
+    print()
+    for (name, _), index in zip(images, winners):
+        won = 'not found' if index is None else f"pass {index} ({analysis.QR_PASSES[index] or 'working res'})"
+        print(f"  {name}: {won}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Compares image analysis at full resolution with the bounded working
+resolution used by /common/analyze-image, over the sample uploads
+(searched recursively).
+
+For every image it prints the ELA score at native resolution (what the
+endpoint uses) and on the downscaled copy, whether the ELA flag would
+agree, the verdicts of a full-resolution and a bounded analysis, and the
+analysis time. ELA scores shift with scale, which is why ELA is kept at
+native resolution. Run from the server directory:
+    python -m benchmarks.compare_image_scaling [--max-side 2048] [--uploads ../php/uploads]
+"""
+import argparse
+import glob
+import os
+import time
+
+from app.core.config import settings
+from app.services import analysis
+from .datagen import UPLOADS_DIR
+
+
+def compare(path: str, max_side: int):
+    with open(path, 'rb') as f:
+        data = f.read()
+    row = {'file': os.path.basename(path)}
+    native = analysis.decode_image(data)
+    for label, side in (('full', None), ('bounded', max_side)):
+        image = analysis.working_copy(native, side) if native is not None else None
+        start = time.perf_counter()
+        result = analysis.analyze_image_heuristics(data, max_side=side)
+        row[label] = {
+            'size': image.size if image is not None else None,
+            'ela': analysis.get_ela_score(image) if image is not None else 0.0,
+            'verdict': result['verdict'],
+            'ms': (time.perf_counter() - start) * 1000,
+        }
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--max-side', type=int, default=settings.IMAGE_WORKING_MAX_SIDE)
+    parser.add_argument('--uploads', default=UPLOADS_DIR)
+    args = parser.parse_args()
+
+    paths = sorted(
+        p for ext in ('jpg', 'jpeg', 'png')
+        for p in glob.glob(os.path.join(args.uploads, '**', f'*.{ext}'), recursive=True)
+    )
+    flags_agree = verdicts_agree = 0
+    print(f"{'file':<44} {'full':>11} {'bounded':>11} {'ela full':>9} {'bounded':>8} {'verdicts':>22} {'ms':>13}")
+    for path in paths:
+        r = compare(path, args.max_side)
+        full, bounded = r['full'], r['bounded']
+        flag_ok = (full['ela'] > analysis.ELA_THRESHOLD) == (bounded['ela'] > analysis.ELA_THRESHOLD)
+        flags_agree += flag_ok
+        verdicts_agree += full['verdict'] == bounded['verdict']
+        size = lambda s: 'x'.join(map(str, s)) if s else '-'
+        print(f"{r['file'][:44]:<44} {size(full['size']):>11} {size(bounded['size']):>11} "
+              f"{full['ela']:>9.2f} {bounded['ela']:>8.2f} {full['verdict'] + '/' + bounded['verdict']:>22} "
+              f"{full['ms']:>6.0f}/{bounded['ms']:<6.0f}{'' if flag_ok else '  ELA flag differs'}")
+    if paths:
+        print(f"\n{len(paths)} images: ELA flag on the downscaled copy agrees with native on {flags_agree}; "
+              f"verdict with bounded QR/working copy agrees with full resolution on {verdicts_agree}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Synthetic inputs for the benchmarks, shaped after the sample uploads in
+php/uploads (sample_transactions_extended.csv: account,payee,amount,ts and
+Bank_Demo_Dataset__100_rows_.csv, which also carries score/verdict/reasons/action).
+Vocabularies and amount/ts ranges are learned from those files when present.
+"""
+import csv
+import glob
+import io
+import os
+import random
+from functools import lru_cache
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+UPLOADS_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'php', 'uploads')
+
+BANK_COLUMNS = ['account', 'payee', 'amount', 'ts']
+ANALYZED_COLUMNS = ['account', 'payee', 'amount', 'score', 'verdict', 'reasons', 'action', 'ts']
+
+_DEFAULT_SHAPE = {
+    'accounts': [f"ACC{1000 + i}" for i in range(1, 21)],
+    'payees': ['urgentrefund@upi', 'trustedshop@upi', 'schoolfees@upi', 'taxdept@upi', 'grocer@upi'],
+    'amount_range': (10.0, 50000.0),
+    'ts_range': (datetime(2025, 8, 20), datetime(2025, 8, 31)),
+    'reasons': ['Known payee history', 'Amount within usual range', 'New/unknown payee'],
+}
+
+
+@lru_cache(maxsize=None)
+def load_shape(uploads_dir: str = UPLOADS_DIR) -> Dict:
+    """
+    Collects accounts, payees, amount and timestamp ranges from the sample CSVs.
+    """
+    accounts, payees, reasons, amounts, stamps = set(), set(), set(), [], []
+    for path in glob.glob(os.path.join(uploads_dir, '*.csv')):
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                accounts.add(row.get('account', '').strip())
+                payees.add(row.get('payee', '').strip().lower())
+                try:
+                    amounts.append(float(row.get('amount', '')))
+                    stamps.append(datetime.fromisoformat(row.get('ts', '').strip().replace(' ', 'T')))
+                except ValueError:
+                    continue
+                for r in (row.get('reasons') or '').split('•'):
+                    if r.strip():
+                        reasons.add(r.strip())
+    if not amounts:
+        return dict(_DEFAULT_SHAPE)
+    return {
+        'accounts': sorted(a for a in accounts if a),
+        'payees': sorted(p for p in payees if p),
+        'amount_range': (min(amounts), max(amounts)),
+        'ts_range': (min(stamps), max(stamps)),
+        'reasons': sorted(reasons) or _DEFAULT_SHAPE['reasons'],
+    }
+
+
+def make_bank_rows(n: int, analyzed: bool = False, seed: int = 7, shape: Dict = None) -> List[Dict[str, str]]:
+    """
+    Returns `n` CSV-like row dicts (all values as strings, as csv.reader would give them).
+    """
+    shape = shape or load_shape()
+    rnd = random.Random(seed)
+    lo, hi = shape['amount_range']
+    start, end = shape['ts_range']
+    span = max(1, int((end - start).total_seconds()))
+    rows = []
+    for _ in range(n):
+        row = {
+            'account': rnd.choice(shape['accounts']),
+            'payee': rnd.choice(shape['payees']),
+            'amount': f"{rnd.uniform(lo, hi):.2f}",
+            'ts': (start + timedelta(seconds=rnd.randrange(span))).strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        if analyzed:
+            score = rnd.randint(5, 95)
+            row.update({
+                'score': str(score),
+                'verdict': 'FRAUD' if score >= 70 else 'SUSPICIOUS' if score >= 40 else 'SAFE',
+                'reasons': ' • '.join(rnd.sample(shape['reasons'], k=min(2, len(shape['reasons'])))),
+                'action': 'Allow • Monitor',
+            })
+        rows.append(row)
+    return rows
+
+
+def make_bank_csv(n: int, analyzed: bool = False, seed: int = 7) -> bytes:
+    columns = ANALYZED_COLUMNS if analyzed else BANK_COLUMNS
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=columns, extrasaction='ignore')
+    writer.writeheader()
+    writer.writerows(make_bank_rows(n, analyzed, seed))
+    return out.getvalue().encode('utf-8')
+
+
+_CHAT_FRAGMENTS = [
+    "please pay", "urgent", "your account will be blocked", "final notice", "hi, sending the invoice",
+    "pay immediately to avoid penalty", "police complaint", "thanks for dinner", "school fees due",
+    "legal action will follow", "refund pending", "kindly confirm", "jaldi bhejo", "see you tomorrow",
+]
+
+
+def make_chat_requests(n: int, seed: int = 3) -> List[Dict]:
+    rnd = random.Random(seed)
+    return [
+        {
+            'message': ' '.join(rnd.choices(_CHAT_FRAGMENTS, k=rnd.randint(2, 12))),
+            'upi': rnd.choice(['trustedshop@upi', 'urgent-refund@ybl', 'x@1', '']),
+            'amount': round(rnd.uniform(10, 50000), 2),
+            'relationship': rnd.choice(['unknown', 'friend', 'family', 'stranger']),
+            'history': rnd.randint(0, 20),
+        }
+        for _ in range(n)
+    ]
+
+
+def make_microfraud_transactions(n: int, seed: int = 5, shape: Dict = None) -> List[Dict]:
+    shape = shape or load_shape()
+    rnd = random.Random(seed)
+    return [
+        {'date': '2025-08-25', 'payee': rnd.choice(shape['payees']), 'amount': round(rnd.uniform(5, 600), 2)}
+        for _ in range(n)
+    ]
+
+
+def make_image(width: int, height: int, seed: int = 1, quality: int = 90) -> bytes:
+    """
+    A JPEG with gradients, blocks and noise, so ELA has real work to do.
+    """
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width]
+    base = np.stack([(x * 255 // max(1, width - 1)), (y * 255 // max(1, height - 1)), ((x + y) % 256)], axis=-1)
+    noise = rng.integers(-12, 13, size=base.shape)
+    pixels = np.clip(base + noise, 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels, 'RGB').save(buffer, 'JPEG', quality=quality)
+    return buffer.getvalue()
@@ -0,0 +1,213 @@
+"""
+End-to-end load harness for the FastAPI app, with no MongoDB and no network.
+
+The real `app` from main.py runs in-process behind httpx's ASGI transport,
+with the Motor client behind core/db.get_database swapped for the in-memory
+stand-in in benchmarks/memory_mongo.py. Requests arrive open-loop at
+--rate per second, spread over the endpoints by --mix weights.
+
+Run from the server directory:
+    python -m benchmarks.loadtest --rate 200 --duration 30 \\
+        --mix upload=1,transactions=4,chatbot=10,image=2,results=4 --output load.json
+"""
+import argparse
+import asyncio
+import bisect
+import json
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import httpx
+
+from . import datagen, memory_mongo
+
+# Histogram bucket upper bounds in milliseconds
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float('inf')]
+
+DEFAULT_MIX = "upload=1,transactions=4,chatbot=10,image=2,results=4"
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies_ms: List[float] = []
+        self.errors = 0
+        self.statuses: Dict[int, int] = defaultdict(int)
+        self.histogram = [0] * len(BUCKETS_MS)
+
+    def record(self, elapsed_ms: float, status: int):
+        self.latencies_ms.append(elapsed_ms)
+        self.statuses[status] += 1
+        if status == 0 or status >= 400:
+            self.errors += 1
+        self.histogram[bisect.bisect_left(BUCKETS_MS, elapsed_ms)] += 1
+
+    def percentile(self, q: float) -> float:
+        if not self.latencies_ms:
+            return 0.0
+        ordered = sorted(self.latencies_ms)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def summary(self, duration: float) -> Dict:
+        n = len(self.latencies_ms)
+        return {
+            'requests': n,
+            'throughput_rps': round(n / duration, 2) if duration else 0.0,
+            'error_rate': round(self.errors / n, 4) if n else 0.0,
+            'statuses': dict(self.statuses),
+            'p50_ms': round(self.percentile(0.50), 2),
+            'p90_ms': round(self.percentile(0.90), 2),
+            'p99_ms': round(self.percentile(0.99), 2),
+            'max_ms': round(max(self.latencies_ms, default=0.0), 2),
+            'histogram_ms': {('+Inf' if b == float('inf') else str(b)): c for b, c in zip(BUCKETS_MS, self.histogram)},
+        }
+
+
+class Payloads:
+    """
+    Pre-built request bodies, so generating load costs as little as possible.
+    """
+    def __init__(self, csv_rows: int, image_size: str, distinct_images: int):
+        width, height = (int(v) for v in image_size.split('x'))
+        self.csv = datagen.make_bank_csv(csv_rows)
+        self.chats = datagen.make_chat_requests(1000)
+        # A few distinct images, so repeat uploads exercise the verdict cache like real traffic
+        self.images = [datagen.make_image(width, height, seed=i) for i in range(distinct_images)]
+        self.rnd = random.Random(42)
+
+
+async def _upload(client, p: Payloads):
+    return await client.post('/bank/upload', files={'file': ('load.csv', p.csv, 'text/csv')})
+
+async def _transactions(client, p: Payloads):
+    return await client.get('/bank/transactions', params={'limit': 25})
+
+async def _chatbot(client, p: Payloads):
+    return await client.post('/common/chatbot', json=p.rnd.choice(p.chats))
+
+async def _image(client, p: Payloads):
+    image = p.rnd.choice(p.images)
+    return await client.post('/common/analyze-image', files={'file': ('load.jpg', image, 'image/jpeg')},
+                             data={'section': 'screenshot'})
+
+async def _results(client, p: Payloads):
+    return await client.get('/common/results', params={'order': p.rnd.choice(['new', 'old', 'hi', 'lo']), 'limit': 50})
+
+ENDPOINTS = {
+    'upload': _upload,
+    'transactions': _transactions,
+    'chatbot': _chatbot,
+    'image': _image,
+    'results': _results,
+}
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint '{name}' in --mix; choose from {', '.join(ENDPOINTS)}")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+async def run_load(args) -> Dict:
+    # Swap the Motor client before the lifespan connects
+    from app.core import db as core_db
+    from app.core.config import settings
+    core_db.AsyncIOMotorClient = memory_mongo.InMemoryClient
+    settings.PROFILE_SNAPSHOT_PATH = os.path.join(tempfile.mkdtemp(prefix='qs-load-'), 'profiles.json')
+    from app.main import app
+
+    weights = parse_mix(args.mix)
+    names, cumulative = list(weights), []
+    total = 0.0
+    for name in names:
+        total += weights[name]
+        cumulative.append(total)
+
+    payloads = Payloads(args.csv_rows, args.image_size, args.distinct_images)
+    stats = {name: EndpointStats() for name in names}
+    dropped = 0
+    in_flight = set()
+    chooser = random.Random(7)
+
+    async def one(name: str, client):
+        start = time.perf_counter()
+        try:
+            response = await ENDPOINTS[name](client, payloads)
+            status = response.status_code
+        except Exception:
+            status = 0
+        stats[name].record((time.perf_counter() - start) * 1000, status)
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://loadtest', timeout=None) as client:
+            started = time.perf_counter()
+            next_at = started
+            while next_at - started < args.duration:
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                if len(in_flight) >= args.max_in_flight:
+                    dropped += 1
+                else:
+                    name = names[bisect.bisect_left(cumulative, chooser.random() * total)]
+                    task = asyncio.create_task(one(name, client))
+                    in_flight.add(task)
+                    task.add_done_callback(in_flight.discard)
+                gap = chooser.expovariate(args.rate) if args.poisson else 1.0 / args.rate
+                next_at += gap
+            if in_flight:
+                await asyncio.wait(in_flight)
+            elapsed = time.perf_counter() - started
+
+    report = {
+        'target_rps': args.rate,
+        'duration_s': round(elapsed, 2),
+        'dropped_by_client': dropped,
+        'endpoints': {name: s.summary(elapsed) for name, s in stats.items()},
+    }
+    return report
+
+
+def print_report(report: Dict):
+    print(f"target {report['target_rps']} req/s for {report['duration_s']}s, "
+          f"{report['dropped_by_client']} arrivals dropped (client in-flight cap)")
+    print(f"{'endpoint':<14} {'reqs':>7} {'rps':>8} {'err%':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, s in report['endpoints'].items():
+        print(f"{name:<14} {s['requests']:>7} {s['throughput_rps']:>8.1f} {s['error_rate'] * 100:>5.1f}% "
+              f"{s['p50_ms']:>9.1f} {s['p90_ms']:>9.1f} {s['p99_ms']:>9.1f} {s['max_ms']:>9.1f}")
+    print("\nlatency histogram (requests per bucket, upper bound in ms)")
+    for name, s in report['endpoints'].items():
+        buckets = ' '.join(f"{b}:{c}" for b, c in s['histogram_ms'].items() if c)
+        print(f"{name:<14} {buckets}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rate', type=float, default=100.0, help="target requests per second (all endpoints)")
+    parser.add_argument('--duration', type=float, default=20.0, help="seconds to generate load for")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="endpoint=weight pairs")
+    parser.add_argument('--poisson', action='store_true', help="exponential inter-arrival times instead of fixed")
+    parser.add_argument('--max-in-flight', type=int, default=1000)
+    parser.add_argument('--csv-rows', type=int, default=1000, help="rows per /bank/upload")
+    parser.add_argument('--image-size', default='1280x720')
+    parser.add_argument('--distinct-images', type=int, default=8)
+    parser.add_argument('--output', help="write the report as JSON to this path")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load(args))
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,324 @@
+"""
+A small in-process stand-in for the Motor client, covering the collection
+and cursor calls the API makes. It exists so the load harness can run the
+real app without a MongoDB server; it is not a general Mongo emulator.
+"""
+import copy
+import functools
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+
+
+class InsertManyResult:
+    def __init__(self, inserted_ids):
+        self.inserted_ids = inserted_ids
+
+
+class BulkWriteResult:
+    def __init__(self, inserted_count=0, matched_count=0, upserted_ids=None):
+        self.inserted_count = inserted_count
+        self.matched_count = matched_count
+        self.upserted_ids = upserted_ids or {}
+        self.upserted_count = len(self.upserted_ids)
+
+
+class DeleteResult:
+    def __init__(self, deleted_count=0):
+        self.deleted_count = deleted_count
+
+
+class UpdateResult:
+    def __init__(self, matched_count=0, modified_count=0, upserted_id=None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+
+
+def _get(doc: Dict, path: str):
+    value = doc
+    for part in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _compare(op: str, value, target) -> bool:
+    try:
+        if op == '$eq':
+            return value == target
+        if op == '$ne':
+            return value != target
+        if op == '$in':
+            return value in target
+        if op == '$nin':
+            return value not in target
+        if op == '$exists':
+            return (value is not None) == bool(target)
+        if op == '$regex':
+            return value is not None and re.search(target, str(value)) is not None
+        if value is None:
+            return False
+        if op == '$gt':
+            return value > target
+        if op == '$gte':
+            return value >= target
+        if op == '$lt':
+            return value < target
+        if op == '$lte':
+            return value <= target
+    except TypeError:
+        return False
+    raise NotImplementedError(f"Query operator {op} is not supported by the stand-in")
+
+
+def matches(doc: Dict, query: Optional[Dict]) -> bool:
+    for key, condition in (query or {}).items():
+        if key == '$and':
+            if not all(matches(doc, q) for q in condition):
+                return False
+        elif key == '$or':
+            if not any(matches(doc, q) for q in condition):
+                return False
+        elif isinstance(condition, dict) and condition and all(k.startswith('$') for k in condition):
+            value = _get(doc, key)
+            if not all(_compare(op, value, target) for op, target in condition.items() if op != '$options'):
+                return False
+        elif _get(doc, key) != condition:
+            return False
+    return True
+
+
+def _apply_update(doc: Dict, update: Dict, inserting: bool):
+    for op, fields in update.items():
+        if op == '$set' or (op == '$setOnInsert' and inserting):
+            for path, value in fields.items():
+                target = doc
+                *parents, leaf = path.split('.')
+                for part in parents:
+                    target = target.setdefault(part, {})
+                target[leaf] = copy.deepcopy(value)
+        elif op == '$inc':
+            for path, amount in fields.items():
+                target = doc
+                *parents, leaf = path.split('.')
+                for part in parents:
+                    target = target.setdefault(part, {})
+                target[leaf] = target.get(leaf, 0) + amount
+        elif op != '$setOnInsert':
+            raise NotImplementedError(f"Update operator {op} is not supported by the stand-in")
+
+
+def _project(doc: Dict, projection: Optional[Dict]) -> Dict:
+    if not projection:
+        return copy.deepcopy(doc)
+    include = {k for k, v in projection.items() if v and k != '_id'}
+    if include:
+        out = {k: copy.deepcopy(doc[k]) for k in include if k in doc}
+        if projection.get('_id', 1) and '_id' in doc:
+            out['_id'] = doc['_id']
+        return out
+    return {k: copy.deepcopy(v) for k, v in doc.items() if projection.get(k, 1)}
+
+
+def _sort_docs(docs: List[Dict], keys: List) -> List[Dict]:
+    def cmp(a, b):
+        for field, direction in keys:
+            va, vb = _get(a, field), _get(b, field)
+            if va == vb:
+                continue
+            if va is None:
+                return -direction
+            if vb is None:
+                return direction
+            return direction if va > vb else -direction
+        return 0
+    return sorted(docs, key=functools.cmp_to_key(cmp))
+
+
+class InMemoryCursor:
+    def __init__(self, docs: List[Dict], projection: Optional[Dict]):
+        self._docs = docs
+        self._projection = projection
+        self._sort = None
+        self._skip = 0
+        self._limit = 0
+        self._iter = None
+
+    def sort(self, key_or_list, direction=None):
+        self._sort = [(key_or_list, direction or 1)] if isinstance(key_or_list, str) else list(key_or_list)
+        return self
+
+    def skip(self, n: int):
+        self._skip = n
+        return self
+
+    def limit(self, n: int):
+        self._limit = n
+        return self
+
+    def batch_size(self, n: int):
+        return self
+
+    def _results(self) -> List[Dict]:
+        docs = _sort_docs(self._docs, self._sort) if self._sort else list(self._docs)
+        docs = docs[self._skip:]
+        if self._limit:
+            docs = docs[:self._limit]
+        return [_project(d, self._projection) for d in docs]
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict]:
+        results = self._results()
+        return results[:length] if length else results
+
+    def __aiter__(self):
+        self._iter = iter(self._results())
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class InMemoryCollection:
+    def __init__(self, name: str):
+        self.name = name
+        self.docs: Dict[Any, Dict] = {}
+        self.indexes: List[Any] = []
+
+    async def create_index(self, keys, **kwargs):
+        self.indexes.append((keys, kwargs))
+        return str(keys)
+
+    async def create_indexes(self, models: Iterable):
+        names = []
+        for model in models:
+            self.indexes.append(model)
+            names.append(str(model))
+        return names
+
+    async def insert_one(self, doc: Dict):
+        doc.setdefault('_id', ObjectId())
+        self.docs[doc['_id']] = copy.deepcopy(doc)
+        return InsertManyResult([doc['_id']])
+
+    async def insert_many(self, docs: List[Dict], ordered: bool = True):
+        ids = []
+        for doc in docs:
+            doc.setdefault('_id', ObjectId())
+            self.docs[doc['_id']] = copy.deepcopy(doc)
+            ids.append(doc['_id'])
+        return InsertManyResult(ids)
+
+    def find(self, query: Optional[Dict] = None, projection: Optional[Dict] = None):
+        return InMemoryCursor([d for d in self.docs.values() if matches(d, query)], projection)
+
+    async def find_one(self, query: Optional[Dict] = None, projection: Optional[Dict] = None):
+        for doc in self.docs.values():
+            if matches(doc, query):
+                return _project(doc, projection)
+        return None
+
+    async def replace_one(self, query: Dict, replacement: Dict, upsert: bool = False):
+        for _id, doc in self.docs.items():
+            if matches(doc, query):
+                self.docs[_id] = {**copy.deepcopy(replacement), '_id': _id}
+                return UpdateResult(1, 1)
+        if upsert:
+            _id = query.get('_id', ObjectId())
+            self.docs[_id] = {**copy.deepcopy(replacement), '_id': _id}
+            return UpdateResult(0, 0, _id)
+        return UpdateResult()
+
+    async def update_one(self, query: Dict, update: Dict, upsert: bool = False):
+        for doc in self.docs.values():
+            if matches(doc, query):
+                _apply_update(doc, update, inserting=False)
+                return UpdateResult(1, 1)
+        if upsert:
+            doc = {k: copy.deepcopy(v) for k, v in query.items() if not k.startswith('$') and not isinstance(v, dict)}
+            _apply_update(doc, update, inserting=True)
+            doc.setdefault('_id', ObjectId())
+            self.docs[doc['_id']] = doc
+            return UpdateResult(0, 0, doc['_id'])
+        return UpdateResult()
+
+    async def update_many(self, query: Dict, update: Dict):
+        matched = [doc for doc in self.docs.values() if matches(doc, query)]
+        for doc in matched:
+            _apply_update(doc, update, inserting=False)
+        return UpdateResult(len(matched), len(matched))
+
+    async def find_one_and_update(
+        self, query: Dict, update: Dict, projection: Optional[Dict] = None,
+        sort: Optional[List] = None, return_document: bool = False
+    ):
+        """
+        Without upsert; return_document takes ReturnDocument (AFTER is True).
+        """
+        docs = [d for d in self.docs.values() if matches(d, query)]
+        if not docs:
+            return None
+        doc = (_sort_docs(docs, sort) if sort else docs)[0]
+        before = _project(doc, projection)
+        _apply_update(doc, update, inserting=False)
+        return _project(doc, projection) if return_document else before
+
+    async def bulk_write(self, requests: List, ordered: bool = True):
+        """
+        Supports InsertOne and UpdateOne requests.
+        """
+        inserted, matched, upserted = 0, 0, {}
+        for index, request in enumerate(requests):
+            if hasattr(request, '_doc') and not hasattr(request, '_filter'):
+                await self.insert_one(request._doc)
+                inserted += 1
+                continue
+            result = await self.update_one(request._filter, request._doc, upsert=request._upsert)
+            matched += result.matched_count
+            if result.upserted_id is not None:
+                upserted[index] = result.upserted_id
+        return BulkWriteResult(inserted, matched, upserted)
+
+    async def delete_many(self, query: Dict):
+        doomed = [_id for _id, doc in self.docs.items() if matches(doc, query)]
+        for _id in doomed:
+            del self.docs[_id]
+        return DeleteResult(len(doomed))
+
+    async def count_documents(self, query: Dict) -> int:
+        return sum(1 for d in self.docs.values() if matches(d, query))
+
+    def aggregate(self, pipeline: List[Dict], **kwargs):
+        raise NotImplementedError("Aggregation pipelines are not supported by the stand-in")
+
+
+class InMemoryDatabase:
+    def __init__(self, name: str):
+        self.name = name
+        self._collections: Dict[str, InMemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> InMemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = InMemoryCollection(name)
+        return self._collections[name]
+
+
+class InMemoryClient:
+    """
+    Drop-in for AsyncIOMotorClient(uri, **kwargs); the arguments are ignored.
+    """
+    def __init__(self, *args, **kwargs):
+        self._databases: Dict[str, InMemoryDatabase] = {}
+
+    def __getitem__(self, name: str) -> InMemoryDatabase:
+        if name not in self._databases:
+            self._databases[name] = InMemoryDatabase(name)
+        return self._databases[name]
+
+    def close(self):
+        pass
@@ -0,0 +1,157 @@
+"""
+Micro-benchmark suite for app/services.
+
+Run from the server directory:
+    python -m benchmarks.suite --sizes 100 10000 100000 --output bench.json
+    python -m benchmarks.suite --baseline bench.json --tolerance 0.15
+
+Row-based cases report rows/s (higher is better) over --sizes; image cases
+report ms/image (lower is better) over --resolutions. With --baseline the
+run is compared case by case and exits with status 1 on any regression
+beyond --tolerance.
+"""
+import argparse
+import asyncio
+import io
+import json
+import platform
+import random
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from fastapi import UploadFile
+
+from app.services import analysis
+from app.services.csv_handler import process_bank_csv
+from . import datagen, memory_mongo
+
+
+@dataclass
+class Case:
+    name: str
+    kind: str                       # 'rows' or 'image'
+    setup: Callable[[Any], Any]
+    run: Callable[[Any], Any]
+
+
+async def _drain_csv(data: bytes):
+    upload = UploadFile(io.BytesIO(data), filename='bench.csv')
+    # An empty database each run, so the duplicate check never skips rows
+    db = memory_mongo.InMemoryClient()['bench']
+    async for _ in process_bank_csv(upload, db, batch_size=1000, chunk_size=1024 * 1024):
+        pass
+
+
+CASES = [
+    Case('analyze_bank_transaction_row', 'rows',
+         lambda n: datagen.make_bank_rows(n),
+         lambda rows: [analysis.analyze_bank_transaction_row(r) for r in rows]),
+    Case('score_bank_rows', 'rows',
+         lambda n: datagen.make_bank_rows(n),
+         analysis.score_bank_rows),
+    Case('process_bank_csv', 'rows',
+         lambda n: datagen.make_bank_csv(n),
+         lambda data: asyncio.run(_drain_csv(data))),
+    Case('process_bank_csv[analyzed]', 'rows',
+         lambda n: datagen.make_bank_csv(n, analyzed=True),
+         lambda data: asyncio.run(_drain_csv(data))),
+    Case('analyze_chatbot_request', 'rows',
+         lambda n: datagen.make_chat_requests(n),
+         lambda reqs: [analysis.analyze_chatbot_request(
+             r['message'], r['upi'], r['amount'], r['relationship'], r['history']) for r in reqs]),
+    Case('analyze_microfraud_transactions', 'rows',
+         lambda n: datagen.make_microfraud_transactions(n),
+         analysis.analyze_microfraud_transactions),
+    Case('get_ela_score', 'image',
+         lambda wh: datagen.make_image(*wh),
+         analysis.get_ela_score),
+    Case('analyze_image_heuristics', 'image',
+         lambda wh: datagen.make_image(*wh),
+         analysis.analyze_image_heuristics),
+]
+
+
+def _best_of(fn, payload, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(payload)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_suite(sizes: List[int], resolutions: List[str], repeat: int, only: List[str]) -> List[Dict]:
+    random.seed(0)
+    results = []
+    for case in CASES:
+        if only and not any(o in case.name for o in only):
+            continue
+        params = sizes if case.kind == 'rows' else resolutions
+        for param in params:
+            if case.kind == 'rows':
+                payload = case.setup(param)
+                elapsed = _best_of(case.run, payload, repeat)
+                value, unit = param / elapsed, 'rows/s'
+            else:
+                payload = case.setup(tuple(int(v) for v in param.split('x')))
+                elapsed = _best_of(case.run, payload, repeat)
+                value, unit = elapsed * 1000, 'ms/image'
+            record = {'case': case.name, 'size': param, 'unit': unit, 'value': round(value, 3)}
+            results.append(record)
+            print(f"{case.name:<36} {str(param):>10} {value:>14,.2f} {unit}", flush=True)
+    return results
+
+
+def compare(results: List[Dict], baseline: List[Dict], tolerance: float) -> List[str]:
+    """
+    Returns a message per case/size that regressed beyond `tolerance`.
+    """
+    previous = {(r['case'], str(r['size'])): r for r in baseline}
+    regressions = []
+    for r in results:
+        old = previous.get((r['case'], str(r['size'])))
+        if old is None or old['unit'] != r['unit'] or not old['value']:
+            continue
+        change = (r['value'] - old['value']) / old['value']
+        worse = change < -tolerance if r['unit'] == 'rows/s' else change > tolerance
+        marker = 'REGRESSION' if worse else 'ok'
+        print(f"{marker:<10} {r['case']:<36} {str(r['size']):>10} {old['value']:>12,.2f} -> {r['value']:>12,.2f} {r['unit']} ({change:+.1%})")
+        if worse:
+            regressions.append(f"{r['case']}[{r['size']}] {change:+.1%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 10_000, 100_000])
+    parser.add_argument('--resolutions', nargs='+', default=['640x480', '1920x1080', '4000x3000'])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', nargs='*', default=[], help="run only cases whose name contains one of these")
+    parser.add_argument('--output', help="write results as JSON to this path")
+    parser.add_argument('--baseline', help="compare against a previous --output file")
+    parser.add_argument('--tolerance', type=float, default=0.15)
+    args = parser.parse_args()
+
+    results = run_suite(args.sizes, args.resolutions, args.repeat, args.only)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'created': datetime.utcnow().isoformat(),
+                'python': sys.version.split()[0],
+                'platform': platform.platform(),
+                'results': results,
+            }, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)['results'], args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
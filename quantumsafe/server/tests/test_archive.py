@@ -0,0 +1,66 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app.services.archive import RetentionSweeper, iter_archive, restore_range
+from benchmarks import memory_mongo
+
+
+def make_sweeper(db, root, restored_days=0):
+    sweeper = RetentionSweeper()
+    sweeper.configure(db, str(root), {'bank_transactions': 30}, {}, 100, 3600.0, restored_days)
+    return sweeper
+
+
+async def seed(db, n=5):
+    old = datetime.utcnow() - timedelta(days=60)
+    await db['bank_transactions'].insert_many([{'i': i, 'verdict': 'SAFE', 'createdAt': old} for i in range(n)])
+    return old.strftime('%Y-%m-%d')
+
+
+def test_restored_documents_are_not_archived_again(tmp_path):
+    async def run():
+        db = memory_mongo.InMemoryClient()['t']
+        day = await seed(db)
+        sweeper = make_sweeper(db, tmp_path)
+        assert await sweeper.sweep() == {'bank_transactions': 5}
+        assert await restore_range(db, str(tmp_path), 'bank_transactions', day, day) == (5, 5)
+        assert await sweeper.sweep() == {}
+        assert await db['bank_transactions'].count_documents({}) == 5
+        archived = list(iter_archive(str(tmp_path), 'bank_transactions', day, day))
+        assert sorted(d['i'] for d in archived) == list(range(5))
+    asyncio.run(run())
+
+
+def test_restored_documents_expire_without_rearchiving(tmp_path):
+    async def run():
+        db = memory_mongo.InMemoryClient()['t']
+        day = await seed(db)
+        sweeper = make_sweeper(db, tmp_path, restored_days=1)
+        await sweeper.sweep()
+        await restore_range(db, str(tmp_path), 'bank_transactions', day, day)
+        await db['bank_transactions'].update_many({}, {'$set': {'restoredAt': datetime.utcnow() - timedelta(days=2)}})
+        await sweeper.sweep()
+        assert await db['bank_transactions'].count_documents({}) == 0
+        assert len(list(iter_archive(str(tmp_path), 'bank_transactions', day, day))) == 5
+        assert sweeper.stats()['expired_restores'] == {'bank_transactions': 5}
+    asyncio.run(run())
+
+
+def test_backfill_counts_archived_and_live_documents_once(tmp_path, monkeypatch):
+    from app.services.rollups import apply_rollups, summarize
+    from app.tools import backfill_rollups
+
+    async def run():
+        db = memory_mongo.InMemoryClient()['t']
+        day = await seed(db)
+        now = datetime.utcnow()
+        await db['bank_transactions'].insert_many([{'i': 10 + i, 'verdict': 'FRAUD', 'score': 80, 'createdAt': now} for i in range(3)])
+        await apply_rollups(db, await db['bank_transactions'].find({}).to_list(), 'bank')
+        await make_sweeper(db, tmp_path).sweep()
+        await restore_range(db, str(tmp_path), 'bank_transactions', day, day, {'i': 0})
+
+        monkeypatch.setattr(backfill_rollups, 'get_database', lambda: db)
+        await backfill_rollups.backfill('bank', 2, str(tmp_path))
+        summary = await summarize(db, 'bank', day, now.strftime('%Y-%m-%d'))
+        assert summary['total'] == 8 and summary['verdicts'] == {'SAFE': 5, 'FRAUD': 3}
+    asyncio.run(run())
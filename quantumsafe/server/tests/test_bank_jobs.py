@@ -0,0 +1,77 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.bank_jobs import BankJobRunner, LeaseLost
+from app.services.csv_handler import analyze_bank_rows, filter_new_rows, store_bank_batch
+from benchmarks import datagen, memory_mongo
+
+
+def make_runner(db, tmp_path, chunk_rows=50):
+    runner = BankJobRunner()
+    runner.db, runner.directory, runner.chunk_rows = db, str(tmp_path), chunk_rows
+    runner.lease_seconds = 60.0
+    return runner
+
+
+async def add_job(db, tmp_path, rows=120, **fields):
+    path = tmp_path / 'job.csv'
+    path.write_bytes(datagen.make_bank_csv(rows))
+    now = datetime.utcnow()
+    job = {
+        '_id': 'job1', 'filename': 'job.csv', 'path': str(path), 'sha256': 'x', 'status': 'queued',
+        'owner': None, 'lease_until': None, 'headers': None, 'has_analysis': False, 'offset': 0,
+        'bytes_total': path.stat().st_size, 'next_row': 0, 'rows': 0, 'inserted': 0, 'duplicates': 0,
+        'verdicts': {}, 'elapsed': 0.0, 'error': None, 'createdAt': now, 'updatedAt': now, 'finishedAt': None,
+        **fields,
+    }
+    await db['bank_jobs'].insert_one(job)
+    return job
+
+
+def test_job_is_claimed_once(tmp_path):
+    async def run():
+        db = memory_mongo.InMemoryClient()['t']
+        await add_job(db, tmp_path)
+        first, second = make_runner(db, tmp_path), make_runner(db, tmp_path)
+        claimed = await first.claim()
+        assert claimed['owner'] == first.owner and claimed['status'] == 'running'
+        assert await second.claim() is None
+    asyncio.run(run())
+
+
+def test_expired_lease_is_taken_over(tmp_path):
+    async def run():
+        db = memory_mongo.InMemoryClient()['t']
+        await add_job(db, tmp_path)
+        first, second = make_runner(db, tmp_path), make_runner(db, tmp_path)
+        await first.claim()
+        await db['bank_jobs'].update_one({'_id': 'job1'}, {'$set': {'lease_until': datetime.utcnow() - timedelta(seconds=1)}})
+        assert (await second.claim())['owner'] == second.owner
+        with pytest.raises(LeaseLost):
+            await first._commit('job1', {'$set': {'offset': 1}})
+    asyncio.run(run())
+
+
+def test_takeover_counts_own_uncommitted_rows(tmp_path):
+    async def run():
+        db = memory_mongo.InMemoryClient()['t']
+        job = await add_job(db, tmp_path, rows=120, status='running', owner='gone', lease_until=datetime.utcnow() - timedelta(seconds=1))
+        # The previous owner stored its first chunk but stopped before committing it
+        header, *lines = open(job['path']).read().splitlines()
+        batch = [dict(zip(header.split(','), line.split(','))) for line in lines[:50]]
+        keep, fingerprints = await filter_new_rows(db, batch)
+        results = analyze_bank_rows([batch[i] for i in keep], False)
+        for result, fp in zip(results, fingerprints):
+            result['fingerprint'] = fp
+        await store_bank_batch(db, results, job_id='job1', rows=keep)
+
+        runner = make_runner(db, tmp_path)
+        claimed = await runner.claim()
+        await runner._process(claimed, asyncio.Event())
+        done = await db['bank_jobs'].find_one({'_id': 'job1'})
+        assert done['status'] == 'done' and done['rows'] == 120
+        assert done['inserted'] == 120 and done['duplicates'] == 0
+        assert sum(done['verdicts'].values()) == 120
+    asyncio.run(run())
@@ -0,0 +1,57 @@
+from datetime import datetime
+
+import pandas as pd
+
+from app.models.bank import BankTransaction
+from app.services.analysis import PROFILE_SIGNALS, parse_bank_timestamps, score_bank_rows
+from app.services.csv_handler import analyze_bank_rows
+from app.services.profiles import ProfileStore
+
+
+def rows(*timestamps):
+    return [{'account': 'ACC1', 'payee': 'Shop@upi', 'amount': '120.5', 'ts': ts} for ts in timestamps]
+
+
+def test_mixed_offsets_become_naive_utc():
+    parsed = parse_bank_timestamps(['2025-08-25T10:00:00+05:30', '2025-08-25T01:00:00-02:00', '2025-08-25T01:00:00Z'])
+    assert parsed.tz is None
+    assert list(parsed) == [pd.Timestamp('2025-08-25 04:30'), pd.Timestamp('2025-08-25 03:00'), pd.Timestamp('2025-08-25 01:00')]
+
+
+def test_mixed_naive_and_aware_values():
+    parsed = parse_bank_timestamps(['2025-08-25T10:00:00+05:30', '2025-08-25 01:00:00', 'not a date', None])
+    assert list(parsed[:2]) == [pd.Timestamp('2025-08-25 04:30'), pd.Timestamp('2025-08-25 01:00')]
+    assert parsed[2:].isna().all()
+
+
+def test_score_bank_rows_returns_stored_documents():
+    docs = score_bank_rows(rows('2025-08-25T10:00:00+05:30', '2025-08-25 01:00:00', ''))
+    assert [d['ts'] for d in docs[:2]] == [datetime(2025, 8, 25, 4, 30), datetime(2025, 8, 25, 1, 0)]
+    assert isinstance(docs[2]['ts'], datetime)
+    for doc in docs:
+        assert doc == BankTransaction(**doc).model_dump(by_alias=True)
+        assert doc['payee'] == 'shop@upi' and doc['amount'] == 120.5
+
+
+def test_aware_timestamps_with_profiles():
+    profiles = ProfileStore()
+    for minute in range(3):
+        profiles.observe('payee', 'shop@upi', 100.0, (datetime(2025, 8, 25, 4, minute) - datetime(1970, 1, 1)).total_seconds())
+    docs = score_bank_rows(rows('2025-08-25T10:10:00+05:30', '2025-08-25 04:20:00'), profiles)
+    assert all("Repeated payments detected" in d['reasons'] for d in docs)
+
+
+def test_analyzed_rows_are_validated():
+    row = {'account': 'ACC1', 'payee': 'shop@upi', 'amount': '5', 'ts': '2025-08-25 01:00:00',
+           'score': '80', 'verdict': 'fraud', 'reasons': 'a, b', 'action': 'Hold'}
+    doc, = analyze_bank_rows([row], has_analysis=True)
+    assert doc['ts'] == datetime(2025, 8, 25, 1, 0) and doc['verdict'] == 'FRAUD' and doc['score'] == 80
+
+
+def test_profile_reasons_follow_the_profiles():
+    profiles = ProfileStore()
+    for day in range(50):
+        profiles.observe('payee', 'shop@upi', 100.0, (datetime(2025, 7, 1 + day % 28) - datetime(1970, 1, 1)).total_seconds())
+    docs = score_bank_rows(rows(*['2025-08-25 04:20:00'] * 2000), profiles)
+    assert not any(name in d['reasons'] for d in docs for name, _ in PROFILE_SIGNALS)
+    assert all(d['reasons'] for d in docs)
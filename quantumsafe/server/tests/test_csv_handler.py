@@ -0,0 +1,98 @@
+import asyncio
+import csv
+import io
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+from app.services.csv_handler import filter_new_rows, iter_csv_rows, store_bank_batch
+from benchmarks import memory_mongo
+
+
+class ChunkedUpload:
+    """Stands in for UploadFile: read(n) returns at most n bytes."""
+    def __init__(self, data: bytes):
+        self.stream = io.BytesIO(data)
+
+    async def read(self, size: int) -> bytes:
+        return self.stream.read(size)
+
+
+CSV_TEXT = (
+    'account,payee,amount,ts,note\r\n'
+    'ACC1,shop@upi,120.5,2025-08-25 10:00:00,"two\nlines"\n'
+    'ACC2,"ca,fé@upi",₹99,2025-08-25 11:00:00,"quoted ""inner"" text\r\nand ✓ 😀 across\n\nthree lines"\n'
+    'ACC3,naïve@upi,7,2025-08-25 12:00:00,€ plain\n'
+    '\n'
+    'ACC4,"end@upi",1,2025-08-25 13:00:00,"last, no newline 😀"'
+)
+
+
+def read_rows(data: bytes, chunk_size: int):
+    async def run():
+        return [row async for rows in iter_csv_rows(ChunkedUpload(data), chunk_size) for row in rows]
+    return asyncio.run(run())
+
+
+def test_chunk_boundaries_match_csv_reader():
+    expected = [row for row in csv.reader(io.StringIO(CSV_TEXT, newline='')) if row]
+    assert len(expected) == 5 and expected[2][4].count('\n') == 3
+    data = ('\ufeff' + CSV_TEXT).encode('utf-8')
+    # Every split point inside quoted multi-line fields and multi-byte characters, then larger chunks
+    for chunk_size in [*range(1, len(data) + 2), 1000, 10000]:
+        assert read_rows(data, chunk_size) == expected, chunk_size
+
+
+def bulk_error(*errors):
+    return BulkWriteError({'writeErrors': list(errors), 'writeConcernErrors': [], 'nInserted': 0,
+                           'upserted': [{'index': 1, '_id': 'b'}]})
+
+
+class FailingCollection:
+    def __init__(self, error):
+        self.error = error
+
+    async def bulk_write(self, ops, ordered=True):
+        raise self.error
+
+
+class FailingDB(dict):
+    def __init__(self, error):
+        super().__init__(bank_transactions=FailingCollection(error), rollups=memory_mongo.InMemoryClient()['t']['rollups'])
+
+
+def docs():
+    return [{'fingerprint': fp, 'verdict': 'SAFE', 'account': 'ACC1', 'payee': 'shop@upi', 'amount': 1.0,
+             'score': 10} for fp in 'ab']
+
+
+def test_duplicate_fingerprints_count_as_stored_elsewhere():
+    duplicate = {'index': 0, 'code': 11000, 'keyPattern': {'fingerprint': 1}, 'errmsg': 'E11000 duplicate key'}
+    db = FailingDB(bulk_error(duplicate))
+    inserted, verdicts = asyncio.run(store_bank_batch(db, docs()))
+    assert inserted == 1 and verdicts == {'SAFE': 1}
+
+
+@pytest.mark.parametrize('error', [
+    {'index': 0, 'code': 11000, 'keyPattern': {'job_id': 1, 'row': 1}, 'errmsg': 'E11000 duplicate key'},
+    {'index': 0, 'code': 121, 'errmsg': 'Document failed validation'},
+])
+def test_other_write_errors_are_raised(error):
+    with pytest.raises(BulkWriteError):
+        asyncio.run(store_bank_batch(FailingDB(bulk_error(error)), docs()))
+
+
+def test_filter_new_rows_within_and_across_batches():
+    async def run():
+        db = memory_mongo.InMemoryClient()['t']
+        row = lambda payee, ts='2025-08-25 10:00:00': {'account': 'ACC1', 'payee': payee, 'amount': '5', 'ts': ts}
+        # Repeats within a batch, including ones that only differ in case, spacing and ts format
+        first = [row('a@upi'), row('b@upi'), row('a@upi'), row(' A@UPI '), row('a@upi', '2025-08-25T10:00:00'), row('c@upi')]
+        keep, fingerprints = await filter_new_rows(db, first)
+        assert keep == [0, 1, 5] and len(set(fingerprints)) == 3
+        await db['bank_transactions'].insert_many([{'fingerprint': fp} for fp in fingerprints])
+
+        # A later batch: stored rows are dropped, new ones kept once
+        keep, fingerprints = await filter_new_rows(db, [row('b@upi'), row('d@upi'), row('c@upi'), row('d@upi')])
+        assert keep == [1] and len(fingerprints) == 1
+    asyncio.run(run())
@@ -0,0 +1,74 @@
+import asyncio
+import json
+
+import httpx
+from fastapi import FastAPI
+
+from app.core.write_buffer import get_write_buffer
+from app.routers import common
+
+
+class RecordingBuffer:
+    def __init__(self):
+        self.docs = []
+
+    def add(self, collection, doc):
+        self.docs.append((collection, doc))
+
+
+def make_app():
+    app = FastAPI()
+    app.include_router(common.router, prefix="/common")
+    buffer = RecordingBuffer()
+    app.dependency_overrides[get_write_buffer] = lambda: buffer
+    return app, buffer
+
+
+async def post_ndjson(app, path, lines, chunk_size=None):
+    body = ''.join(json.dumps(line) + '\n' for line in lines).encode()
+
+    async def chunks():
+        size = chunk_size or len(body)
+        for i in range(0, len(body), size):
+            yield body[i:i + size]
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://test', timeout=10) as client:
+        response = await client.post(path, content=chunks(), headers={'content-type': 'application/x-ndjson'})
+    return response.status_code, [json.loads(l) for l in response.text.splitlines()]
+
+
+def test_chatbot_batch_small_body():
+    app, buffer = make_app()
+    lines = [{'id': 'a', 'message': 'urgent pay now', 'upi': 'x@ybl'}, {'message': 'hi'}]
+    status, out = asyncio.run(asyncio.wait_for(post_ndjson(app, '/common/chatbot/batch', lines), 10))
+    assert status == 200
+    assert [r['line'] for r in out] == [1, 2]
+    assert out[0]['id'] == 'a' and 'verdict' in out[0]
+    assert len(buffer.docs) == 2
+
+
+def test_chatbot_batch_large_chunked_body():
+    app, buffer = make_app()
+    lines = [{'id': i, 'message': 'please send money ' * 20} for i in range(2000)]
+    status, out = asyncio.run(asyncio.wait_for(
+        post_ndjson(app, '/common/chatbot/batch', lines, chunk_size=4096), 30
+    ))
+    assert status == 200
+    assert len(out) == 2000
+    assert [r['id'] for r in out] == list(range(2000))
+
+
+def test_microfraud_batch_reports_invalid_items():
+    app, buffer = make_app()
+    lines = [
+        {'id': 1, 'transactions': [{'date': '2025-08-25', 'payee': 'shop', 'amount': 10}]},
+        {'id': 2, 'transactions': [1, 2]},
+        [1, 2],
+        {'id': 4, 'transactions_text': '2025-08-25, shop, 12\n2025-08-25, shop, 13'},
+    ]
+    status, out = asyncio.run(asyncio.wait_for(post_ndjson(app, '/common/microfraud/batch', lines), 10))
+    assert status == 200
+    assert [r['line'] for r in out] == [1, 2, 3, 4]
+    assert 'results' in out[0] and 'results' in out[3]
+    assert 'error' in out[1] and 'error' in out[2]
@@ -0,0 +1,38 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from app.services.pagination import SORT_ORDERS, apply_cursor, encode_cursor
+from benchmarks import memory_mongo
+
+
+def sorted_by(docs, order):
+    # Stable sorts from the last key to the first give the full compound order
+    result = list(docs)
+    for field, direction in reversed(SORT_ORDERS[order]):
+        result.sort(key=lambda d: d[field], reverse=direction < 0)
+    return result
+
+
+@pytest.mark.parametrize('order', ['lo', 'hi', 'new', 'old'])
+def test_cursor_pages_cover_tied_scores_exactly_once(order):
+    async def run():
+        db = memory_mongo.InMemoryClient()['t']
+        base = datetime(2025, 8, 25)
+        # Three scores and two createdAt values, so most neighbours tie on both
+        docs = [{'_id': ObjectId(), 'feature': 'screenshot', 'score': (i * 7) % 3 * 10,
+                 'createdAt': base + timedelta(seconds=i % 2)} for i in range(23)]
+        await db['common_analyses'].insert_many([dict(d) for d in docs])
+
+        seen, cursor = [], None
+        while True:
+            query = apply_cursor({'feature': 'screenshot'}, order, cursor)
+            page = await db['common_analyses'].find(query).sort(SORT_ORDERS[order]).limit(4).to_list(None)
+            if not page:
+                break
+            seen.extend(page)
+            cursor = encode_cursor(page[-1], order)
+        assert [d['_id'] for d in seen] == [d['_id'] for d in sorted_by(docs, order)]
+    asyncio.run(run())
@@ -0,0 +1,29 @@
+import asyncio
+import threading
+
+from app.core.profiler import SamplingProfiler, active_profiler
+from app.core.workers import WorkerPool
+from app.services import analysis
+from benchmarks import datagen
+
+
+def test_pool_work_is_sampled_into_the_request_profile():
+    async def run():
+        pool = WorkerPool("image")
+        pool.start(1, 0)
+        try:
+            image = datagen.make_image(1600, 1200)
+            await pool.run(analysis.analyze_image_with_timings, image)  # warm up the worker
+            profiler = SamplingProfiler(threading.get_ident(), 0.001)
+            token = active_profiler.set(profiler)
+            try:
+                result, _ = await pool.run(analysis.analyze_image_with_timings, image)
+            finally:
+                active_profiler.reset(token)
+        finally:
+            pool.shutdown()
+        assert 'verdict' in result
+        pooled = [stack for stack in profiler.stacks if stack.startswith('image-pool;')]
+        assert pooled and any('analysis.py' in stack for stack in pooled)
+        assert profiler.samples >= len(pooled)
+    asyncio.run(run())
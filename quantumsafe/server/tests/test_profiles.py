@@ -0,0 +1,68 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app.services.profiles import ProfileStore, UploadProfiles
+from benchmarks import memory_mongo
+
+
+def test_snapshot_round_trips_as_json(tmp_path):
+    store = ProfileStore()
+    store.observe_rows([{'payee': 'shop@upi', 'account': 'ACC1', 'amount': 10.0, 'ts': datetime(2025, 8, 25, 1),
+                         'createdAt': datetime(2025, 8, 25, 2)}])
+    path = tmp_path / 'profiles.json'
+    store.snapshot(str(path))
+    assert path.read_text().startswith('{')
+
+    loaded = ProfileStore()
+    assert loaded.load_snapshot(str(path))
+    assert loaded.watermark == datetime(2025, 8, 25, 2)
+    assert loaded.get('payee', 'shop@upi').count == 1 and loaded.get('account', 'ACC1').mean == 10.0
+
+
+def test_unreadable_snapshot_is_ignored(tmp_path):
+    path = tmp_path / 'profiles.json'
+    path.write_bytes(b'\x80\x04not json')
+    assert not ProfileStore().load_snapshot(str(path))
+
+
+def test_workers_converge_from_mongo():
+    async def run():
+        db = memory_mongo.InMemoryClient()['t']
+        first, second = ProfileStore(), ProfileStore()
+        first.lag_seconds = second.lag_seconds = 10.0
+        old = datetime.utcnow() - timedelta(minutes=1)
+        await db['bank_transactions'].insert_many([
+            {'payee': 'shop@upi', 'account': 'ACC1', 'amount': 5.0, 'ts': old, 'createdAt': old},
+            {'payee': 'shop@upi', 'account': 'ACC1', 'amount': 7.0, 'ts': old, 'createdAt': datetime.utcnow()},
+        ])
+        assert await first.sync_from_db(db) == 1
+        assert await second.sync_from_db(db) == 1
+        # The row inside the lag window is picked up once it settles, exactly once
+        second.lag_seconds = 0.0
+        assert await second.sync_from_db(db) == 1
+        assert await second.sync_from_db(db) == 0
+        assert first.get('payee', 'shop@upi').count == 1 and second.get('payee', 'shop@upi').count == 2
+    asyncio.run(run())
+
+
+def test_upload_sees_its_own_batches_until_synced():
+    async def run():
+        db = memory_mongo.InMemoryClient()['t']
+        store = ProfileStore()
+        store.lag_seconds = 0.0
+        upload = UploadProfiles(store)
+        created = datetime.utcnow() - timedelta(seconds=1)
+        docs = [{'payee': 'shop@upi', 'account': 'ACC1', 'amount': float(a), 'ts': created, 'createdAt': created}
+                for a in (5, 7, 9)]
+        upload.observe_rows(docs)
+        assert store.get('payee', 'shop@upi') is None
+        merged = upload.get('payee', 'shop@upi')
+        assert merged.count == 3 and merged.mean == 7.0 and merged.std == 2.0
+
+        # Once the store replays the stored rows the batch is dropped, not counted twice
+        await db['bank_transactions'].insert_many(docs)
+        assert await store.sync_from_db(db) == 3
+        upload.observe_rows([{'payee': 'shop@upi', 'amount': 11.0, 'ts': created, 'createdAt': datetime.utcnow()}])
+        merged = upload.get('payee', 'shop@upi')
+        assert merged.count == 4 and merged.mean == 8.0 and abs(merged.variance - 20 / 3) < 1e-9
+    asyncio.run(run())
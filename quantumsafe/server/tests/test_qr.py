@@ -0,0 +1,16 @@
+import os
+
+import pytest
+
+from app.core.config import settings
+from app.services import analysis
+
+QR_SAMPLE = os.path.join(os.path.dirname(__file__), '..', '..', 'qr.jpg')
+
+
+@pytest.mark.skipif(analysis.cv2 is None, reason="opencv-python is not installed")
+def test_dark_mode_qr_decodes_at_the_cheapest_pass():
+    with open(QR_SAMPLE, 'rb') as f:
+        image = analysis.working_copy(analysis.decode_image(f.read()), settings.IMAGE_WORKING_MAX_SIDE)
+    text, index = analysis.decode_qr(image)
+    assert text.startswith('upi://pay?') and index == 0
@@ -0,0 +1,49 @@
+import json
+import random
+
+import pytest
+
+from app.services.rules import DEFAULT_RULES_PATH, CompiledRules
+
+# Phrases that overlap, share prefixes, or sit inside one another
+OVERLAPPING_PACK = {
+    'version': 'test', 'upi_pattern': '.*',
+    'categories': [
+        {'id': 'a', 'reason': 'A', 'risk': 1, 'phrases': ['otp']},
+        {'id': 'b', 'reason': 'B', 'risk': 1, 'phrases': ['ot', 'otp code']},
+        {'id': 'c', 'reason': 'C', 'risk': 1, 'phrases': ['code now', 'pay']},
+        {'id': 'd', 'reason': 'D', 'risk': 1, 'phrases': ['payment link', 'link']},
+        {'id': 'e', 'reason': 'E', 'risk': 1, 'phrases': ['ment', 'nk o']},
+        {'id': 'f', 'reason': 'F', 'risk': 1, 'phrases': ['aaa', 'aab']},
+    ],
+}
+
+
+def substring_match(pack, text):
+    return [cat['id'] for cat in pack['categories'] if any(p.lower() in text for p in cat['phrases'])]
+
+
+def random_texts(pack, n, seed=5):
+    # Glue phrases, their prefixes/suffixes and filler so matches overlap and abut
+    rnd = random.Random(seed)
+    phrases = [p.lower() for cat in pack['categories'] for p in cat['phrases']]
+    pieces = phrases + [p[:rnd.randint(1, len(p))] for p in phrases] + [p[rnd.randint(0, len(p) - 1):] for p in phrases]
+    pieces += [' ', 'a', 'x', 'please ', ' now']
+    return [''.join(rnd.choice(pieces) for _ in range(rnd.randint(0, 8))) for _ in range(n)]
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('otp code now', ['a', 'b', 'c']),
+    ('payment link on', ['c', 'd', 'e']),
+    ('aaab', ['f']),
+    ('o t p', []),
+])
+def test_overlapping_and_prefix_phrases(text, expected):
+    assert [c.id for c in CompiledRules(OVERLAPPING_PACK).match(text)] == expected
+
+
+@pytest.mark.parametrize('pack', [OVERLAPPING_PACK, json.loads(DEFAULT_RULES_PATH.read_text(encoding='utf-8'))])
+def test_match_agrees_with_substring_search(pack):
+    rules = CompiledRules(pack)
+    for text in random_texts(pack, 2000):
+        assert [c.id for c in rules.match(text)] == substring_match(pack, text), text
@@ -0,0 +1,117 @@
+import asyncio
+
+from app.core.write_buffer import WriteBehindBuffer
+
+
+class FakeCollection:
+    def __init__(self, fail=None):
+        self.docs = []
+        self.fail = fail
+
+    async def insert_many(self, docs, ordered=True):
+        if self.fail is not None:
+            raise self.fail
+        self.docs.extend(docs)
+
+
+class FakeDB(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+
+def make_buffer(db, max_docs=100, flush_seconds=0.01, max_pending=1000):
+    buffer = WriteBehindBuffer()
+    buffer.start(db, max_docs, flush_seconds, max_pending)
+    return buffer
+
+
+def test_add_drops_beyond_max_pending():
+    async def run():
+        buffer = make_buffer(FakeDB(), max_pending=3)
+        results = [buffer.add('logs', {'i': i}) for i in range(5)]
+        assert results == [True, True, True, False, False]
+        assert buffer.depth == 3 and buffer.stats()['dropped_docs'] == 2
+        await buffer.drain()
+    asyncio.run(run())
+
+
+def test_failing_callback_does_not_stop_other_listeners():
+    async def run():
+        db = FakeDB()
+        seen = []
+
+        async def broken(db, docs):
+            raise RuntimeError("boom")
+
+        async def recorder(db, docs):
+            seen.extend(docs)
+
+        buffer = make_buffer(db)
+        buffer.on_flush('logs', broken)
+        buffer.on_flush('logs', recorder)
+        buffer.add('logs', {'i': 1})
+        await buffer.flush()
+        assert seen == [{'i': 1}] and db['logs'].docs == [{'i': 1}]
+        assert buffer.stats()['failed_callbacks'] == 1
+        await buffer.drain()
+    asyncio.run(run())
+
+
+def test_flusher_survives_unexpected_errors():
+    async def run():
+        db = FakeDB()
+        db['logs'] = FakeCollection(fail=RuntimeError("unexpected"))
+        buffer = make_buffer(db)
+        buffer.add('logs', {'i': 1})
+        await asyncio.sleep(0.05)
+        assert not buffer._task.done()
+        db['logs'].fail = None
+        buffer.add('logs', {'i': 2})
+        await asyncio.sleep(0.05)
+        # The failed document was requeued, not lost
+        assert db['logs'].docs == [{'i': 1}, {'i': 2}]
+        assert buffer.stats()['dropped_docs'] == 0
+        await buffer.drain()
+    asyncio.run(run())
+
+
+def test_failure_keeps_other_collections():
+    async def run():
+        db = FakeDB()
+        db['a'] = FakeCollection(fail=RuntimeError("unexpected"))
+        buffer = make_buffer(db, flush_seconds=60)
+        for name in 'abc':
+            buffer.add(name, {'c': name})
+        await buffer.flush()
+        assert db['b'].docs == [{'c': 'b'}] and db['c'].docs == [{'c': 'c'}]
+        assert buffer.depth == 1
+        db['a'].fail = None
+        await buffer.drain()
+        assert db['a'].docs == [{'c': 'a'}] and buffer.depth == 0
+    asyncio.run(run())
+
+
+def test_cancelled_flush_requeues_unwritten_documents():
+    async def run():
+        db = FakeDB()
+        started = asyncio.Event()
+
+        class SlowCollection(FakeCollection):
+            async def insert_many(self, docs, ordered=True):
+                started.set()
+                await asyncio.sleep(10)
+
+        db['a'] = SlowCollection()
+        buffer = make_buffer(db, flush_seconds=60)
+        buffer.add('a', {'i': 1})
+        buffer.add('b', {'i': 2})
+        flush = asyncio.create_task(buffer.flush())
+        await started.wait()
+        flush.cancel()
+        await asyncio.gather(flush, return_exceptions=True)
+        assert buffer.depth == 2 and buffer.stats()['dropped_docs'] == 0
+        db['a'] = FakeCollection()
+        await buffer.drain()
+        assert db['a'].docs == [{'i': 1}] and db['b'].docs == [{'i': 2}]
+    asyncio.run(run())